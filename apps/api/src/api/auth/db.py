@@ -3,7 +3,38 @@ from __future__ import annotations
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
-from api.db import get_engine
+from api.auth.passwords import verify_password
+from api.db import get_engine, read_connection
+
+_Q_REGISTER_USER = text(
+    """
+    WITH new_user AS (
+        INSERT INTO users (display_name)
+        VALUES (:display_name)
+        RETURNING id
+    )
+    INSERT INTO user_credentials (user_id, email, password_hash)
+    SELECT id, :email, :password_hash
+    FROM new_user
+    RETURNING user_id
+    """
+)
+
+_Q_AUTH_SELECT = text(
+    """
+    SELECT user_id, password_hash
+    FROM user_credentials
+    WHERE email = :email
+    """
+)
+
+_Q_UPDATE_PASSWORD_HASH = text(
+    """
+    UPDATE user_credentials
+    SET password_hash = :password_hash
+    WHERE user_id = :user_id
+    """
+)
 
 
 class EmailAlreadyRegisteredError(ValueError):
@@ -14,32 +45,25 @@ class InvalidCredentialsError(ValueError):
     pass
 
 
+def _normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
 def register_user(*, email: str, password_hash: str, display_name: str | None) -> int:
     engine = get_engine()
-    normalized_email = email.strip().lower()
-
-    q_insert_user = text("INSERT INTO users (display_name) VALUES (:display_name) RETURNING id")
-    q_insert_credentials = text(
-        """
-        INSERT INTO user_credentials (user_id, email, password_hash)
-        VALUES (:user_id, :email, :password_hash)
-        """
-    )
+    normalized_email = _normalize_email(email)
 
     try:
         with engine.begin() as conn:
-            user_row = conn.execute(q_insert_user, {"display_name": display_name}).first()
-            if user_row is None:
-                raise RuntimeError("Failed to create user")
-            user_id = int(user_row[0])
-
-            conn.execute(
-                q_insert_credentials,
-                {
-                    "user_id": user_id,
-                    "email": normalized_email,
-                    "password_hash": password_hash,
-                },
+            user_id = int(
+                conn.execute(
+                    _Q_REGISTER_USER,
+                    {
+                        "display_name": display_name,
+                        "email": normalized_email,
+                        "password_hash": password_hash,
+                    },
+                ).scalar_one()
             )
     except IntegrityError as exc:
         raise EmailAlreadyRegisteredError("Email already registered") from exc
@@ -49,25 +73,21 @@ def register_user(*, email: str, password_hash: str, display_name: str | None) -
 
 def authenticate_user(*, email: str, password: str) -> int:
     engine = get_engine()
-    normalized_email = email.strip().lower()
-
-    q = text(
-        """
-        SELECT user_id, password_hash
-        FROM user_credentials
-        WHERE email = :email
-        """
-    )
+    normalized_email = _normalize_email(email)
 
-    with engine.begin() as conn:
-        row = conn.execute(q, {"email": normalized_email}).mappings().first()
+    with read_connection() as conn:
+        row = conn.execute(_Q_AUTH_SELECT, {"email": normalized_email}).mappings().first()
 
     if not row:
         raise InvalidCredentialsError("Invalid credentials")
 
-    from api.auth.passwords import verify_password
-
-    if not verify_password(password, row["password_hash"]):
+    verified, new_hash = verify_password(password, row["password_hash"])
+    if not verified:
         raise InvalidCredentialsError("Invalid credentials")
 
-    return int(row["user_id"])
+    user_id = int(row["user_id"])
+    if new_hash is not None:
+        with engine.begin() as conn:
+            conn.execute(_Q_UPDATE_PASSWORD_HASH, {"password_hash": new_hash, "user_id": user_id})
+
+    return user_id
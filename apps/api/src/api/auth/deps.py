@@ -23,7 +23,10 @@ def get_current_user_id(
     if not isinstance(subject, str) or not subject:
         raise HTTPException(status_code=401, detail="Invalid token subject")
 
-    if subject.isdigit():
+    # Locally issued tokens carry the numeric user id; anything else is an OIDC subject.
+    # ASCII digits only: int() would also accept signs, whitespace, underscores and other
+    # scripts' digits, and str.isdigit() alone lets superscripts through to int().
+    if subject.isascii() and subject.isdigit():
         return int(subject)
 
     try:
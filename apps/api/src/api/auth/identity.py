@@ -5,6 +5,21 @@ from sqlalchemy import text
 from api.db import get_engine
 from api.users import create_user
 
+_Q_IDENTITY_SELECT = text(
+    """
+    SELECT user_id
+    FROM user_identities
+    WHERE provider = :provider AND subject = :subject
+    """
+)
+
+_Q_IDENTITY_INSERT = text(
+    """
+    INSERT INTO user_identities (provider, subject, user_id)
+    VALUES (:provider, :subject, :user_id)
+    """
+)
+
 
 class IdentityProviderNotSupportedError(ValueError):
     pass
@@ -16,27 +31,19 @@ def get_or_create_user_id_for_subject(*, provider: str, subject: str) -> int:
 
     engine = get_engine()
 
-    q_select = text(
-        """
-        SELECT user_id
-        FROM user_identities
-        WHERE provider = :provider AND subject = :subject
-        """
-    )
-
     with engine.begin() as conn:
-        row = conn.execute(q_select, {"provider": provider, "subject": subject}).mappings().first()
+        row = (
+            conn.execute(_Q_IDENTITY_SELECT, {"provider": provider, "subject": subject})
+            .mappings()
+            .first()
+        )
         if row:
             return int(row["user_id"])
 
         user_id = create_user(display_name=None)
 
-        q_insert = text(
-            """
-            INSERT INTO user_identities (provider, subject, user_id)
-            VALUES (:provider, :subject, :user_id)
-            """
+        conn.execute(
+            _Q_IDENTITY_INSERT, {"provider": provider, "subject": subject, "user_id": user_id}
         )
-        conn.execute(q_insert, {"provider": provider, "subject": subject, "user_id": user_id})
 
     return int(user_id)
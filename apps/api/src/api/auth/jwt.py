@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-import json
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
 import time
 import urllib.request
-import uuid
+from dataclasses import dataclass
+from typing import Any
 
 import jwt
+import orjson
 
 from api.config import (
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES,
@@ -13,14 +20,29 @@ from api.config import (
     JWT_SECRET_KEY,
     KEYCLOAK_AUDIENCE,
     KEYCLOAK_ISSUER_URL,
+    KEYCLOAK_JWKS_TIMEOUT_S,
     KEYCLOAK_JWKS_URL,
 )
+from api.ttl_cache import TTLCache
+
+logger = logging.getLogger("api")
 
 
 class InvalidTokenError(ValueError):
     pass
 
 
+class _JwksUnavailableError(InvalidTokenError):
+    # Transient: says nothing about the token itself, so it must not be negatively cached.
+    pass
+
+
+class _UnknownTokenKeyError(InvalidTokenError):
+    # The key may just not be fetched yet (rotation during the refresh interval), so a valid
+    # token must not be remembered as invalid.
+    pass
+
+
 def create_access_token(*, user_id: int) -> str:
     now = int(time.time())
     exp = now + JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
@@ -28,60 +50,137 @@ def create_access_token(*, user_id: int) -> str:
         "sub": str(user_id),
         "iat": now,
         "exp": exp,
-        "jti": str(uuid.uuid4()),
+        "jti": secrets.token_urlsafe(16),
     }
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 
-_JWKS_CACHE: tuple[float, dict] | None = None
-_JWKS_CACHE_TTL_S = 60.0
+@dataclass(frozen=True)
+class _JwksCacheEntry:
+    fetched_at: float
+    soft_expiry: float
+    hard_expiry: float
+    keys: dict[str, Any]
 
 
-def _load_jwks(jwks_url: str) -> dict:
-    global _JWKS_CACHE
+# Replaced atomically under `_JWKS_REFRESH_LOCK`; readers never take the lock.
+_JWK_KEY_CACHE: _JwksCacheEntry | None = None
+_JWKS_REFRESH_LOCK = threading.Lock()
+# Past the soft TTL the cached keys are still served while one background refresh runs;
+# requests only block on the network once the hard TTL has passed.
+_JWKS_SOFT_TTL_S = 60.0
+_JWKS_HARD_TTL_S = 600.0
+_JWKS_FETCH_RETRY_BACKOFF_S = 0.2
+# Unknown `kid`s trigger a forced refresh (key rotation); don't let them hammer the JWKS endpoint.
+_JWKS_MIN_REFRESH_INTERVAL_S = 5.0
 
-    now = time.time()
-    if _JWKS_CACHE is not None:
-        cached_at, cached = _JWKS_CACHE
-        if now - cached_at < _JWKS_CACHE_TTL_S:
-            return cached
 
-    try:
-        with urllib.request.urlopen(jwks_url, timeout=2.0) as resp:  # noqa: S310
-            payload = json.loads(resp.read().decode("utf-8"))
-    except Exception as exc:
-        raise InvalidTokenError("Failed to load JWKS") from exc
+def _parse_jwks_keys(payload: dict) -> dict[str, Any]:
+    keys: dict[str, Any] = {}
+    for candidate in payload["keys"]:
+        if not isinstance(candidate, dict):
+            continue
+        kid = candidate.get("kid")
+        if not isinstance(kid, str) or not kid:
+            continue
+        try:
+            keys[kid] = jwt.PyJWK.from_dict(candidate).key
+        except Exception:
+            continue
+    return keys
 
-    if not isinstance(payload, dict) or "keys" not in payload:
-        raise InvalidTokenError("Invalid JWKS payload")
 
-    _JWKS_CACHE = (now, payload)
-    return payload
+def _fetch_jwks_keys(jwks_url: str) -> dict[str, Any]:
+    last_exc: Exception | None = None
+    for attempt in range(2):
+        if attempt:
+            time.sleep(_JWKS_FETCH_RETRY_BACKOFF_S)
+        try:
+            with urllib.request.urlopen(jwks_url, timeout=KEYCLOAK_JWKS_TIMEOUT_S) as resp:  # noqa: S310
+                payload = orjson.loads(resp.read())
+            break
+        except Exception as exc:
+            last_exc = exc
+    else:
+        raise _JwksUnavailableError("Failed to load JWKS") from last_exc
+
+    if not isinstance(payload, dict) or not isinstance(payload.get("keys"), list):
+        raise _JwksUnavailableError("Invalid JWKS payload")
+
+    return _parse_jwks_keys(payload)
+
+
+def _refresh_jwks(jwks_url: str) -> _JwksCacheEntry:
+    # Caller must hold `_JWKS_REFRESH_LOCK`.
+    global _JWK_KEY_CACHE
+
+    keys = _fetch_jwks_keys(jwks_url)
+    now = time.monotonic()
+    entry = _JwksCacheEntry(
+        fetched_at=now,
+        soft_expiry=now + _JWKS_SOFT_TTL_S,
+        hard_expiry=now + _JWKS_HARD_TTL_S,
+        keys=keys,
+    )
+    _JWK_KEY_CACHE = entry
+    return entry
+
+
+def _refresh_jwks_in_background(jwks_url: str) -> None:
+    if not _JWKS_REFRESH_LOCK.acquire(blocking=False):
+        return  # A refresh is already in flight.
+
+    def _run() -> None:
+        try:
+            _refresh_jwks(jwks_url)
+        except InvalidTokenError:
+            logger.warning("jwks_refresh_failed", exc_info=True)
+        finally:
+            _JWKS_REFRESH_LOCK.release()
+
+    threading.Thread(target=_run, name="jwks-refresh", daemon=True).start()
+
+
+def _load_jwks(jwks_url: str, *, force_refresh: bool = False) -> dict[str, Any]:
+    now = time.monotonic()
+    cached = _JWK_KEY_CACHE
+    if cached is not None:
+        if force_refresh:
+            if now - cached.fetched_at < _JWKS_MIN_REFRESH_INTERVAL_S:
+                return cached.keys
+        elif now < cached.soft_expiry:
+            return cached.keys
+        elif now < cached.hard_expiry:
+            _refresh_jwks_in_background(jwks_url)
+            return cached.keys
+
+    with _JWKS_REFRESH_LOCK:
+        # Another request may have refreshed the keys while we waited for the lock.
+        cached = _JWK_KEY_CACHE
+        if cached is not None and cached.fetched_at >= now:
+            return cached.keys
+        return _refresh_jwks(jwks_url).keys
 
 
 def _decode_keycloak_token(token: str) -> dict:
     if not KEYCLOAK_JWKS_URL or not KEYCLOAK_ISSUER_URL or not KEYCLOAK_AUDIENCE:
         raise InvalidTokenError("Keycloak verification not configured")
 
-    unverified_header = jwt.get_unverified_header(token)
+    try:
+        unverified_header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as exc:
+        raise InvalidTokenError("Invalid token header") from exc
     kid = unverified_header.get("kid")
     if not isinstance(kid, str) or not kid:
         raise InvalidTokenError("Invalid token header")
 
-    jwks = _load_jwks(KEYCLOAK_JWKS_URL)
-    key = None
-    for candidate in jwks.get("keys", []):
-        if isinstance(candidate, dict) and candidate.get("kid") == kid:
-            key = candidate
-            break
+    public_key = _load_jwks(KEYCLOAK_JWKS_URL).get(kid)
+    if public_key is None:
+        # The signing key may have been rotated since the last fetch.
+        public_key = _load_jwks(KEYCLOAK_JWKS_URL, force_refresh=True).get(kid)
 
-    if key is None:
-        raise InvalidTokenError("Unknown token key")
-
-    try:
-        public_key = jwt.PyJWK.from_dict(key).key
-    except Exception as exc:
-        raise InvalidTokenError("Invalid JWKS key") from exc
+    if public_key is None:
+        raise _UnknownTokenKeyError("Unknown token key")
 
     try:
         payload = jwt.decode(
@@ -109,11 +208,121 @@ def _decode_keycloak_token(token: str) -> dict:
     raise InvalidTokenError("Invalid token audience")
 
 
-def decode_token(token: str) -> dict:
-    if KEYCLOAK_JWKS_URL and KEYCLOAK_ISSUER_URL and KEYCLOAK_AUDIENCE:
-        return _decode_keycloak_token(token)
+_HS256_KEY = JWT_SECRET_KEY.encode("utf-8")
+
 
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _numeric_date(payload: dict, claim: str) -> int | None:
+    # JSON numbers only: numeric strings and booleans are rejected, and int() raises on
+    # inf/nan, which the caller reports as an invalid token.
+    if claim not in payload:
+        return None
+    value = payload[claim]
+    if isinstance(value, bool) or not isinstance(value, int | float):
+        raise ValueError(f"Invalid {claim} claim")
+    return int(value)
+
+
+def _decode_hs256(token: str) -> dict:
+    # Mirrors `jwt.decode(token, key, algorithms=["HS256"])` without PyJWT's generic
+    # algorithm/option machinery: like PyJWT with no audience configured, a non-empty `aud`
+    # claim is rejected. Any `crit` header is rejected too; PyJWT would also accept the `b64`
+    # extension, which our tokens never use. The HMAC covers the exact header and payload
+    # segments, so nothing is parsed from the payload until the signature has been checked.
+    try:
+        signing_input, _, signature_segment = token.rpartition(".")
+        header_segment, _, payload_segment = signing_input.partition(".")
+        if not header_segment or not payload_segment or "." in payload_segment:
+            raise ValueError("Malformed token")
+
+        header = orjson.loads(_b64url_decode(header_segment))
+        if not isinstance(header, dict) or header.get("alg") != "HS256":
+            raise ValueError("Unexpected token algorithm")
+        if "crit" in header:
+            raise ValueError("Unsupported critical header")
+
+        expected = hmac.new(_HS256_KEY, signing_input.encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_segment)):
+            raise ValueError("Signature mismatch")
+
+        payload = orjson.loads(_b64url_decode(payload_segment))
+        if not isinstance(payload, dict):
+            raise ValueError("Invalid token payload")
+        if payload.get("aud"):
+            raise ValueError("Unexpected token audience")
+
+        now = time.time()
+        exp = _numeric_date(payload, "exp")
+        if exp is not None and exp <= now:
+            raise ValueError("Token expired")
+        iat = _numeric_date(payload, "iat")
+        if iat is not None and iat > now:
+            raise ValueError("Token issued in the future")
+        nbf = _numeric_date(payload, "nbf")
+        if nbf is not None and nbf > now:
+            raise ValueError("Token not yet valid")
+    except (ValueError, TypeError, OverflowError) as exc:
+        raise InvalidTokenError("Invalid token") from exc
+
+    return payload
+
+
+# Bearer tokens are replayed on every request for their whole lifetime, and each request
+# decodes them twice (rate-limit key, then auth dependency), so verified payloads from either
+# issuer are cached, expiring no later than the token itself.
+_TOKEN_CACHE_MAX_SIZE = 10_000
+_TOKEN_CACHE_TTL_S = 60.0
+_TOKEN_CACHE: TTLCache[str, dict] = TTLCache(_TOKEN_CACHE_MAX_SIZE, _TOKEN_CACHE_TTL_S)
+
+
+def _cache_payload(token: str, payload: dict) -> None:
+    exp = payload.get("exp")
+    ttl_s = None
+    if isinstance(exp, int | float) and not isinstance(exp, bool):
+        ttl_s = float(exp) - time.time()
+    _TOKEN_CACHE.set(token, payload, ttl_s)
+
+
+def _decode_local_token(token: str) -> dict:
+    if JWT_ALGORITHM == "HS256":
+        return _decode_hs256(token)
     try:
         return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
     except jwt.PyJWTError as exc:
         raise InvalidTokenError("Invalid token") from exc
+
+
+# Rejected tokens are remembered briefly (by hash) so a client replaying garbage or expired
+# bearer tokens is turned away without re-parsing or re-verifying them.
+_INVALID_TOKEN_CACHE_MAX_SIZE = 50_000
+_INVALID_TOKEN_CACHE_TTL_S = 30.0
+_INVALID_TOKEN_CACHE: TTLCache[int, bool] = TTLCache(
+    _INVALID_TOKEN_CACHE_MAX_SIZE, _INVALID_TOKEN_CACHE_TTL_S
+)
+
+
+def decode_token(token: str) -> dict:
+    cached = _TOKEN_CACHE.get(token)
+    if cached is not None:
+        return cached
+
+    token_key = hash(token)
+    if _INVALID_TOKEN_CACHE.get(token_key):
+        raise InvalidTokenError("Invalid token")
+
+    try:
+        if KEYCLOAK_JWKS_URL and KEYCLOAK_ISSUER_URL and KEYCLOAK_AUDIENCE:
+            payload = _decode_keycloak_token(token)
+        else:
+            payload = _decode_local_token(token)
+    except (_JwksUnavailableError, _UnknownTokenKeyError):
+        raise
+    except InvalidTokenError:
+        _INVALID_TOKEN_CACHE.set(token_key, True)
+        raise
+
+    _cache_payload(token, payload)
+    return payload
@@ -1,11 +1,32 @@
 from passlib.context import CryptContext
 
-_password_ctx = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+_ARGON2_TIME_COST = 2
+_ARGON2_MEMORY_COST = 19456
+_ARGON2_PARALLELISM = 1
+
+# New hashes use argon2id; legacy pbkdf2_sha256 hashes still verify and are upgraded on login.
+_password_ctx = CryptContext(
+    schemes=["argon2", "pbkdf2_sha256"],
+    deprecated=["pbkdf2_sha256"],
+    argon2__type="ID",
+    argon2__time_cost=_ARGON2_TIME_COST,
+    argon2__memory_cost=_ARGON2_MEMORY_COST,
+    argon2__parallelism=_ARGON2_PARALLELISM,
+)
+_ARGON2 = _password_ctx.handler("argon2")
+# Hashes produced with the current settings start with exactly this prefix, so they can skip
+# scheme identification and the needs-update check.
+_CURRENT_ARGON2_PREFIX = (
+    f"$argon2id$v=19$m={_ARGON2_MEMORY_COST},t={_ARGON2_TIME_COST},p={_ARGON2_PARALLELISM}$"
+)
 
 
 def hash_password(password: str) -> str:
     return _password_ctx.hash(password)
 
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return _password_ctx.verify(password, password_hash)
+def verify_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """Return whether the password matches and, if the stored hash is outdated, a new one."""
+    if password_hash.startswith(_CURRENT_ARGON2_PREFIX):
+        return _ARGON2.verify(password, password_hash), None
+    return _password_ctx.verify_and_update(password, password_hash)
@@ -33,19 +33,24 @@ USER_UNWATCHED_COOLDOWN_DAYS = int(os.getenv("USER_UNWATCHED_COOLDOWN_DAYS", "90
 TMDB_IMAGE_BASE_URL = os.getenv("TMDB_IMAGE_BASE_URL", "https://image.tmdb.org/t/p/")
 TMDB_POSTER_SIZE = os.getenv("TMDB_POSTER_SIZE", "w500")
 TMDB_BACKDROP_SIZE = os.getenv("TMDB_BACKDROP_SIZE", "w780")
-FRONTEND_ORIGINS = [
-    origin.strip()
-    for origin in os.getenv(
-        "FRONTEND_ORIGINS",
-        "http://localhost:3000,http://localhost:5173",
-    ).split(",")
-    if origin.strip()
-]
+FRONTEND_ORIGINS = tuple(
+    origin
+    for origin in (
+        raw.strip()
+        for raw in os.getenv(
+            "FRONTEND_ORIGINS",
+            "http://localhost:3000,http://localhost:5173",
+        ).split(",")
+    )
+    if origin
+)
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_REQUEST_SAMPLE_RATE = _float_env("LOG_REQUEST_SAMPLE_RATE", 1.0, min_val=0.0, max_val=1.0)
 
 
-def _int_env(name: str, default: int, min_val: int | None = None) -> int:
+def _int_env(
+    name: str, default: int, min_val: int | None = None, max_val: int | None = None
+) -> int:
     raw = os.getenv(name)
     if raw is None:
         return default
@@ -55,6 +60,8 @@ def _int_env(name: str, default: int, min_val: int | None = None) -> int:
         raise ValueError(f"Invalid {name}: '{raw}' is not a valid integer") from exc
     if min_val is not None and value < min_val:
         raise ValueError(f"Invalid {name}: {value} is below minimum {min_val}")
+    if max_val is not None and value > max_val:
+        raise ValueError(f"Invalid {name}: {value} exceeds maximum {max_val}")
     return value
 
 
@@ -73,17 +80,38 @@ RECOMMENDATIONS_CACHE_TTL_S = _int_env("RECOMMENDATIONS_CACHE_TTL_S", 600, min_v
 RECOMMENDATIONS_CACHE_MAX_WINDOWS_PER_REQUEST = _int_env(
     "RECOMMENDATIONS_CACHE_MAX_WINDOWS_PER_REQUEST", 1, min_val=1
 )
+MOVIE_CACHE_TTL_S = _int_env("MOVIE_CACHE_TTL_S", 600, min_val=0)
+MOVIE_CACHE_MAX_SIZE = _int_env("MOVIE_CACHE_MAX_SIZE", 50_000, min_val=1)
+USER_CACHE_TTL_S = _int_env("USER_CACHE_TTL_S", 600, min_val=0)
+USER_CACHE_MAX_SIZE = _int_env("USER_CACHE_MAX_SIZE", 65_536, min_val=1)
 
-DB_POOL_SIZE = _int_env("DB_POOL_SIZE", 5, min_val=1)
-DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", 10, min_val=0)
+# Sync endpoints run on AnyIO's worker threads; keep pool + overflow >= API_THREADPOOL_SIZE so
+# requests don't queue on connection checkout.
+API_THREADPOOL_SIZE = _int_env("API_THREADPOOL_SIZE", 40, min_val=1)
+DB_POOL_SIZE = _int_env("DB_POOL_SIZE", 20, min_val=1)
+DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", 20, min_val=0)
 DB_POOL_TIMEOUT_S = _int_env("DB_POOL_TIMEOUT_S", 30, min_val=1)
 DB_POOL_RECYCLE_S = _int_env("DB_POOL_RECYCLE_S", 1800, min_val=0)
 DB_STATEMENT_TIMEOUT_MS = _int_env("DB_STATEMENT_TIMEOUT_MS", 30_000, min_val=0)
+# An HNSW index scan yields at most ef_search rows, so the default lets one recommendation
+# window fill from the index (pgvector caps it at 1000). Set to 0 to keep the server default.
+DB_HNSW_EF_SEARCH = _int_env(
+    "DB_HNSW_EF_SEARCH", min(MAX_FETCH_CANDIDATES, 1000), min_val=0, max_val=1000
+)
+# pgvector >= 0.8 can resume an HNSW scan when filters drop rows, instead of returning fewer
+# than LIMIT. strict_order keeps results exactly ordered by distance; "off" disables it.
+DB_HNSW_ITERATIVE_SCAN = os.getenv("DB_HNSW_ITERATIVE_SCAN", "strict_order").strip().lower()
+if DB_HNSW_ITERATIVE_SCAN not in {"off", "strict_order", "relaxed_order"}:
+    raise ValueError(f"Invalid DB_HNSW_ITERATIVE_SCAN: '{DB_HNSW_ITERATIVE_SCAN}'")
+# psycopg server-side prepares a query after this many executions on a connection.
+# Set to 0 to disable prepared statements (e.g. behind PgBouncer in transaction mode).
+DB_PREPARE_THRESHOLD = _int_env("DB_PREPARE_THRESHOLD", 5, min_val=0)
 MAX_REQUEST_BYTES = _int_env("MAX_REQUEST_BYTES", 2_000_000, min_val=1)
 ENABLE_HSTS = _bool_env("ENABLE_HSTS", False)
 KEYCLOAK_ISSUER_URL = os.getenv("KEYCLOAK_ISSUER_URL")
 KEYCLOAK_JWKS_URL = os.getenv("KEYCLOAK_JWKS_URL")
 KEYCLOAK_AUDIENCE = os.getenv("KEYCLOAK_AUDIENCE")
+KEYCLOAK_JWKS_TIMEOUT_S = _float_env("KEYCLOAK_JWKS_TIMEOUT_S", 5.0, min_val=0.1)
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
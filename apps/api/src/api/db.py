@@ -5,20 +5,41 @@ import time
 
 from pgvector.psycopg import register_vector
 from sqlalchemy import create_engine, event
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 
 from api.config import (
     DATABASE_URL,
+    DB_HNSW_EF_SEARCH,
+    DB_HNSW_ITERATIVE_SCAN,
     DB_MAX_OVERFLOW,
     DB_POOL_RECYCLE_S,
     DB_POOL_SIZE,
     DB_POOL_TIMEOUT_S,
+    DB_PREPARE_THRESHOLD,
     DB_STATEMENT_TIMEOUT_MS,
     LOG_DB_SLOW_QUERY_MS,
 )
 
 _ENGINE: Engine | None = None
 _logger = logging.getLogger("db")
+# LOG_DB_SLOW_QUERY_MS <= 0 logs all queries.
+_LOG_ALL_QUERIES = LOG_DB_SLOW_QUERY_MS <= 0
+_SLOW_QUERY_NS = int(LOG_DB_SLOW_QUERY_MS * 1_000_000)
+# Applied once per new pooled connection, in a single round trip. hnsw.ef_search is a
+# session setting because reads run in autocommit, where SET LOCAL would not outlive its
+# own statement.
+_SESSION_SETTINGS = "; ".join(
+    setting
+    for setting, enabled in (
+        (f"SET statement_timeout = {DB_STATEMENT_TIMEOUT_MS}", DB_STATEMENT_TIMEOUT_MS > 0),
+        (f"SET hnsw.ef_search = {DB_HNSW_EF_SEARCH}", DB_HNSW_EF_SEARCH > 0),
+        (
+            f"SET hnsw.iterative_scan = {DB_HNSW_ITERATIVE_SCAN}",
+            DB_HNSW_ITERATIVE_SCAN != "off",
+        ),
+    )
+    if enabled
+)
 
 
 def get_engine() -> Engine:
@@ -31,35 +52,58 @@ def get_engine() -> Engine:
             max_overflow=DB_MAX_OVERFLOW,
             pool_timeout=DB_POOL_TIMEOUT_S,
             pool_recycle=DB_POOL_RECYCLE_S,
+            connect_args={"prepare_threshold": DB_PREPARE_THRESHOLD or None},
         )
 
         @event.listens_for(_ENGINE, "connect")
         def _on_connect(dbapi_conn, _):
             register_vector(dbapi_conn)
-            if DB_STATEMENT_TIMEOUT_MS > 0:
+            if _SESSION_SETTINGS:
                 cursor = dbapi_conn.cursor()
-                cursor.execute(f"SET statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+                cursor.execute(_SESSION_SETTINGS)
                 cursor.close()
 
-        @event.listens_for(_ENGINE, "before_cursor_execute")
-        def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
-            conn.info["query_start_time"] = time.perf_counter()
-
-        @event.listens_for(_ENGINE, "after_cursor_execute")
-        def _after_cursor_execute(conn, _cursor, statement, _parameters, _context, executemany):
-            start = conn.info.pop("query_start_time", None)
-            if start is None:
-                return
-            duration_ms = (time.perf_counter() - start) * 1000
-            # LOG_DB_SLOW_QUERY_MS <= 0 logs all queries.
-            if LOG_DB_SLOW_QUERY_MS <= 0 or duration_ms >= LOG_DB_SLOW_QUERY_MS:
+        # Query timing is only ever logged at INFO; skip the hooks entirely when that's disabled.
+        if _logger.isEnabledFor(logging.INFO):
+
+            @event.listens_for(_ENGINE, "before_cursor_execute")
+            def _before_cursor_execute(
+                conn, _cursor, _statement, _parameters, _context, _executemany
+            ):
+                conn.info["query_start_ns"] = time.perf_counter_ns()
+
+            @event.listens_for(_ENGINE, "after_cursor_execute")
+            def _after_cursor_execute(conn, _cursor, statement, _parameters, _context, executemany):
+                start = conn.info.pop("query_start_ns", None)
+                if start is None:
+                    return
+                duration_ns = time.perf_counter_ns() - start
+                if not _LOG_ALL_QUERIES and duration_ns < _SLOW_QUERY_NS:
+                    return
                 _logger.info(
                     "db_query",
                     extra={
-                        "duration_ms": round(duration_ms, 2),
+                        "duration_ms": round(duration_ns / 1_000_000, 2),
                         "statement": statement.strip()[:500],
                         "executemany": executemany,
                     },
                 )
 
     return _ENGINE
+
+
+def dispose_engine() -> None:
+    """Close pooled connections; the next ``get_engine()`` call builds a fresh engine."""
+    global _ENGINE
+    if _ENGINE is not None:
+        _ENGINE.dispose()
+        _ENGINE = None
+
+
+def read_connection() -> Connection:
+    """Connection for read-only queries.
+
+    Runs in autocommit so psycopg doesn't spend a round trip each on BEGIN and COMMIT.
+    Use ``engine.begin()`` for anything that writes or needs a consistent snapshot.
+    """
+    return get_engine().connect().execution_options(isolation_level="AUTOCOMMIT")
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from api.config import TMDB_BACKDROP_SIZE, TMDB_IMAGE_BASE_URL, TMDB_POSTER_SIZE
+
+_POSTER_PREFIX = f"{TMDB_IMAGE_BASE_URL}{TMDB_POSTER_SIZE}"
+_BACKDROP_PREFIX = f"{TMDB_IMAGE_BASE_URL}{TMDB_BACKDROP_SIZE}"
+
+
+def build_poster_url(poster_path: str | None) -> str | None:
+    return _POSTER_PREFIX + poster_path if poster_path else None
+
+
+def build_backdrop_url(backdrop_path: str | None) -> str | None:
+    return _BACKDROP_PREFIX + backdrop_path if backdrop_path else None
+
+
+class ImageUrlsMixin:
+    """Fills ``poster_url``/``backdrop_url`` once when a row dataclass is built.
+
+    Dataclasses using this declare both as ``field(init=False)``.
+    """
+
+    poster_path: str | None
+    backdrop_path: str | None
+    poster_url: str | None
+    backdrop_url: str | None
+
+    def __post_init__(self) -> None:
+        self.poster_url = build_poster_url(self.poster_path)
+        self.backdrop_url = build_backdrop_url(self.backdrop_path)
@@ -1,15 +1,15 @@
-import json
 import logging
 import logging.config
 from datetime import UTC, datetime
 
+import orjson
+
 from api.config import LOG_LEVEL
 from api.logging_context import request_id_ctx
 
 
 def _json_safe(obj):
-    if isinstance(obj, datetime):
-        return obj.isoformat()
+    # orjson serializes datetimes, dataclasses, etc. natively; anything else is logged as text.
     return str(obj)
 
 
@@ -56,7 +56,7 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
 
-        return json.dumps(payload, default=_json_safe)
+        return orjson.dumps(payload, default=_json_safe).decode("utf-8")
 
 
 def configure_logging() -> None:
@@ -1,23 +1,30 @@
+import itertools
 import logging
 import random
+import secrets
 import time
-import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
+import anyio.to_thread
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
+from sqlalchemy import text
 from starlette import status
 
 from api.config import (
+    API_THREADPOOL_SIZE,
     ENABLE_HSTS,
     FRONTEND_ORIGINS,
     LOG_REQUEST_SAMPLE_RATE,
     LOG_SLOW_REQUEST_MS,
     MAX_REQUEST_BYTES,
 )
+from api.db import dispose_engine, get_engine
 from api.logging_config import configure_logging
 from api.logging_context import request_id_ctx
 from api.rate_limit import limiter
@@ -28,51 +35,87 @@ from api.v1.main import router as v1_router
 configure_logging()
 logger = logging.getLogger("api")
 
-app = FastAPI(title="TMDB RecSys API")
-app.state.limiter = limiter
 
+_Q_CREATE_USER_IDENTITIES = text(
+    """
+    CREATE TABLE IF NOT EXISTS user_identities (
+      provider TEXT NOT NULL,
+      subject TEXT NOT NULL,
+      user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+      PRIMARY KEY (provider, subject),
+      UNIQUE (user_id)
+    );
+    """
+)
 
-def _run_startup_migrations() -> None:
-    from sqlalchemy import text
 
-    from api.db import get_engine
+_Q_ADD_PROFILE_RATINGS_DIGEST = text(
+    "ALTER TABLE user_profiles ADD COLUMN IF NOT EXISTS ratings_digest TEXT"
+)
+
 
+def _run_startup_migrations() -> None:
     engine = get_engine()
     with engine.begin() as conn:
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS user_identities (
-                  provider TEXT NOT NULL,
-                  subject TEXT NOT NULL,
-                  user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-                  PRIMARY KEY (provider, subject),
-                  UNIQUE (user_id)
-                );
-                """
-            )
-        )
-
-
-@app.on_event("startup")
-def _startup() -> None:
+        conn.execute(_Q_CREATE_USER_IDENTITIES)
+        conn.execute(_Q_ADD_PROFILE_RATINGS_DIGEST)
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Every DB-bound endpoint is a sync `def` served from this limiter's worker threads.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
+    # Builds the engine and its pool before the first request arrives.
     _run_startup_migrations()
+    try:
+        yield
+    finally:
+        dispose_engine()
+
+
+# Leave default_response_class alone: routes declare response_model, so FastAPI serializes
+# responses straight to JSON bytes in pydantic-core (a custom response class disables that).
+app = FastAPI(title="TMDB RecSys API", lifespan=_lifespan)
+app.state.limiter = limiter
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=FRONTEND_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
+    # Auth uses bearer tokens, not cookies, so credentialed CORS isn't needed.
+    allow_methods=["GET", "POST", "PUT"],
     allow_headers=["Authorization", "Content-Type", "X-Request-ID"],
     max_age=600,
 )
 app.add_middleware(SlowAPIMiddleware)
 
 
+# Generated request ids are a per-process random prefix plus a counter: unique enough for
+# log correlation and much cheaper than uuid4 on every request.
+_REQUEST_ID_PREFIX = secrets.token_hex(4)
+_REQUEST_COUNTER = itertools.count(1)
+# Health probes skip request ids, timing and logging, but still get the security headers.
+_QUIET_PATHS = frozenset({"/health", "/v1/health"})
+_SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+}
+if ENABLE_HSTS:
+    _SECURITY_HEADERS["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+
+
 @app.middleware("http")
 async def harden_and_log_requests(request: Request, call_next):
-    request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+    if request.url.path in _QUIET_PATHS:
+        response = await call_next(request)
+        response.headers.update(_SECURITY_HEADERS)
+        return response
+
+    request_id = (
+        request.headers.get("X-Request-ID") or f"{_REQUEST_ID_PREFIX}-{next(_REQUEST_COUNTER):x}"
+    )
     request_id_ctx.set(request_id)
 
     if MAX_REQUEST_BYTES > 0:
@@ -94,13 +137,16 @@ async def harden_and_log_requests(request: Request, call_next):
     duration_ms = (time.perf_counter() - start) * 1000
 
     response.headers["X-Request-ID"] = request_id
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+    response.headers.update(_SECURITY_HEADERS)
 
-    if ENABLE_HSTS:
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    if duration_ms >= LOG_SLOW_REQUEST_MS:
+        log_level, flag = logging.INFO, "slow"
+    elif LOG_REQUEST_SAMPLE_RATE > 0 and random.random() < LOG_REQUEST_SAMPLE_RATE:
+        log_level, flag = logging.INFO, "sampled"
+    elif logger.isEnabledFor(logging.DEBUG):
+        log_level, flag = logging.DEBUG, None
+    else:
+        return response
 
     log_payload = {
         "method": request.method,
@@ -110,12 +156,9 @@ async def harden_and_log_requests(request: Request, call_next):
         "request_id": request_id,
         "client": request.client.host if request.client else None,
     }
-    if duration_ms >= LOG_SLOW_REQUEST_MS:
-        logger.info("request_complete", extra=log_payload | {"slow": True})
-    elif LOG_REQUEST_SAMPLE_RATE > 0 and random.random() < LOG_REQUEST_SAMPLE_RATE:
-        logger.info("request_complete", extra=log_payload | {"sampled": True})
-    else:
-        logger.debug("request_complete", extra=log_payload)
+    if flag is not None:
+        log_payload[flag] = True
+    logger.log(log_level, "request_complete", extra=log_payload)
 
     return response
 
@@ -205,9 +248,13 @@ async def generic_exception_handler(_request: Request, exc: Exception) -> JSONRe
     )
 
 
+_HEALTH_BODY = b'{"status":"ok"}'
+
+
 @app.get("/health")
-async def health():
-    return {"status": "ok"}
+async def health() -> Response:
+    # Constant body; skip JSON encoding for frequent liveness probes.
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 app.include_router(v1_router, prefix="/v1")
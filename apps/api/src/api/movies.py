@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 
 from sqlalchemy import text
 
-from api.db import get_engine
+from api.config import MOVIE_CACHE_MAX_SIZE, MOVIE_CACHE_TTL_S
+from api.db import read_connection
+from api.images import ImageUrlsMixin
+from api.ttl_cache import TTLCache
 
 
 @dataclass
-class MovieDetail:
+class MovieDetail(ImageUrlsMixin):
     id: int
     title: str | None
     original_title: str | None
@@ -23,31 +26,63 @@ class MovieDetail:
     vote_count: int | None
     poster_path: str | None
     backdrop_path: str | None
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
+
+
+_MOVIE_DETAIL_SELECT = """
+    SELECT id,
+           title,
+           original_title,
+           release_date,
+           genres,
+           overview,
+           tagline,
+           runtime,
+           original_language,
+           vote_average,
+           vote_count,
+           poster_path,
+           backdrop_path
+    FROM movies
+"""
+_Q_MOVIE_DETAIL = text(_MOVIE_DETAIL_SELECT + "WHERE id = :movie_id")
+_Q_MOVIE_DETAILS = text(_MOVIE_DETAIL_SELECT + "WHERE id = ANY(:movie_ids)")
+
+# Movie rows only change on re-ingest, so a TTL is enough to pick up updates.
+_MOVIE_DETAIL_CACHE: TTLCache[int, MovieDetail] = TTLCache(MOVIE_CACHE_MAX_SIZE, MOVIE_CACHE_TTL_S)
 
 
 def fetch_movie_detail(movie_id: int) -> MovieDetail | None:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT id,
-               title,
-               original_title,
-               release_date,
-               genres,
-               overview,
-               tagline,
-               runtime,
-               original_language,
-               vote_average,
-               vote_count,
-               poster_path,
-               backdrop_path
-        FROM movies
-        WHERE id = :movie_id
-        """
-    )
-    with engine.begin() as conn:
-        row = conn.execute(q, {"movie_id": movie_id}).mappings().first()
+    cached = _MOVIE_DETAIL_CACHE.get(movie_id)
+    if cached is not None:
+        return cached
+    with read_connection() as conn:
+        row = conn.execute(_Q_MOVIE_DETAIL, {"movie_id": movie_id}).mappings().first()
     if not row:
         return None
-    return MovieDetail(**row)
+    movie = MovieDetail(**row)
+    _MOVIE_DETAIL_CACHE.set(movie_id, movie)
+    return movie
+
+
+def fetch_movie_details(movie_ids: list[int]) -> list[MovieDetail]:
+    """Fetch several movies in one query, in input order; unknown ids are skipped."""
+    found: dict[int, MovieDetail] = {}
+    missing: list[int] = []
+    for movie_id in movie_ids:
+        cached = _MOVIE_DETAIL_CACHE.get(movie_id)
+        if cached is not None:
+            found[movie_id] = cached
+        else:
+            missing.append(movie_id)
+
+    if missing:
+        with read_connection() as conn:
+            rows = conn.execute(_Q_MOVIE_DETAILS, {"movie_ids": missing}).mappings().all()
+        for row in rows:
+            movie = MovieDetail(**row)
+            _MOVIE_DETAIL_CACHE.set(movie.id, movie)
+            found[movie.id] = movie
+
+    return [found[movie_id] for movie_id in movie_ids if movie_id in found]
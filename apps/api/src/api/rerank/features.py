@@ -1,24 +1,29 @@
 from __future__ import annotations
 
+import sys
 from collections.abc import Iterable
 from datetime import date
 
 from api.rerank.style_keywords import STYLE_KEYWORDS
 
 
+# Tokens are interned so the same genre or keyword is one shared object across movies, and
+# set intersections between contexts mostly resolve on identity instead of string compares.
 def _split_items(value: str | None) -> set[str]:
     if not value:
         return set()
-    parts = [item.strip().lower() for item in value.split(",")]
-    return {item for item in parts if item}
+    # Lowercase once and build the set in a single pass, with no intermediate list.
+    return {sys.intern(token) for item in value.lower().split(",") if (token := item.strip())}
 
 
 def parse_genres(genres_str: str | None) -> set[str]:
     return _split_items(genres_str)
 
 
-def parse_keywords(keywords_str: str | None) -> set[str]:
-    return _split_items(keywords_str)
+def parse_keyword_sets(keywords_str: str | None) -> tuple[set[str], set[str]]:
+    """Return all keywords and their style subset, split in one pass."""
+    keywords = _split_items(keywords_str)
+    return keywords, keywords & STYLE_KEYWORDS
 
 
 def extract_year(release_date: date | str | None) -> int | None:
@@ -1,11 +1,38 @@
 from __future__ import annotations
 
+import heapq
 import math
-from dataclasses import dataclass
+import sys
+import threading
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
 
-from api.rerank.features import extract_year, parse_genres, parse_keywords, style_keywords
+import numpy as np
 
-TONAL_GENRES: set[str] = {"comedy", "horror", "romance", "family"}
+from api.rerank.features import extract_year, parse_genres, parse_keyword_sets
+
+_CONTEXT_CACHE_SIZE = 50_000
+
+# Genres are a small closed vocabulary, so each one gets a bit the first time it is seen and
+# genre overlap becomes integer bit operations instead of set hashing.
+_GENRE_BITS: dict[str, int] = {}
+_GENRE_BITS_LOCK = threading.Lock()
+
+
+def genre_mask(genres: Iterable[str]) -> int:
+    mask = 0
+    for genre in genres:
+        bit = _GENRE_BITS.get(genre)
+        if bit is None:
+            with _GENRE_BITS_LOCK:
+                bit = _GENRE_BITS.setdefault(genre, 1 << len(_GENRE_BITS))
+        mask |= bit
+    return mask
+
+
+TONAL_GENRES: set[str] = {sys.intern(g) for g in ("comedy", "horror", "romance", "family")}
+_TONAL_MASK = genre_mask(TONAL_GENRES)
 
 
 @dataclass(frozen=True)
@@ -16,6 +43,10 @@ class ScoringContext:
     runtime: int | None
     year: int | None
     language: str | None
+    genre_bits: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "genre_bits", genre_mask(self.genres))
 
 
 def _jaccard(left: set[str], right: set[str]) -> float:
@@ -24,6 +55,20 @@ def _jaccard(left: set[str], right: set[str]) -> float:
     return len(left & right) / len(left | right)
 
 
+def _jaccard_bits(left: int, right: int) -> float:
+    if not left or not right:
+        return 0.0
+    return (left & right).bit_count() / (left | right).bit_count()
+
+
+def _tonal_mismatch_mask(anchor_bits: int) -> int:
+    """Tonal genres a candidate is penalised for: those the anchor doesn't have."""
+    return _TONAL_MASK & ~anchor_bits
+
+
+# Popular movies show up in most candidate pools; parse each one's fields once.
+# Cached contexts are shared between callers and must not be mutated.
+@lru_cache(maxsize=_CONTEXT_CACHE_SIZE)
 def build_context(
     genres: str | None,
     keywords: str | None,
@@ -31,66 +76,92 @@ def build_context(
     release_date,
     language: str | None,
 ) -> ScoringContext:
-    parsed_genres = parse_genres(genres)
-    parsed_keywords = parse_keywords(keywords)
+    parsed_keywords, style = parse_keyword_sets(keywords)
     return ScoringContext(
-        genres=parsed_genres,
+        genres=parse_genres(genres),
         keywords=parsed_keywords,
-        style=style_keywords(parsed_keywords),
+        style=style,
         runtime=runtime,
         year=extract_year(release_date),
         language=language.lower() if language else None,
     )
 
 
-def score_candidate(
+def inverse_log_max_vote(max_vote_count: int) -> float:
+    """Quality normaliser shared by every candidate in one rerank; 0.0 disables quality."""
+    return 1.0 / math.log1p(max_vote_count) if max_vote_count > 0 else 0.0
+
+
+# Feature weights: sim, genre, style, quality, language, then the tonal, runtime and year
+# penalties.
+_FEATURE_WEIGHTS = np.array([0.70, 0.15, 0.10, 0.05, 0.03, -0.06, -0.05, -0.05])
+
+
+def score_candidates(
     anchor: ScoringContext,
-    candidate: ScoringContext,
-    distance: float,
-    vote_count: int | None,
-    max_vote_count: int,
-) -> float:
-    # Assumes `distance` is cosine distance from pgvector (<=>), which is typically in [0, 2].
-    # Cosine similarity = 1 - distance, which can be in [-1, 1].
-    # For ranking, negative similarities are usually not helpful, so clamp into [0, 1].
-    sim = 1.0 - float(distance)
-    sim = max(0.0, min(sim, 1.0))
-
-    genre_jaccard = _jaccard(anchor.genres, candidate.genres)
-    style_jaccard = _jaccard(anchor.style, candidate.style)
-
-    runtime_penalty = 0.0
-    if anchor.runtime is not None and candidate.runtime is not None:
-        runtime_penalty = min(abs(anchor.runtime - candidate.runtime) / 120.0, 1.0)
-
-    year_penalty = 0.0
-    if anchor.year is not None and candidate.year is not None:
-        year_penalty = min(abs(anchor.year - candidate.year) / 50.0, 1.0)
-
-    lang_bonus = 0.0
-    if anchor.language and candidate.language and anchor.language == candidate.language:
-        lang_bonus = 1.0
-
-    quality = 0.0
-    if max_vote_count > 0 and vote_count:
-        quality = math.log1p(vote_count) / math.log1p(max_vote_count)
-
-    # Tonal genre mismatch penalty.
-    anchor_tonal = anchor.genres & TONAL_GENRES
-    candidate_tonal = candidate.genres & TONAL_GENRES
-    mismatched = candidate_tonal - anchor_tonal
-    tonal_penalty = min(len(mismatched), 2) / 2.0  # 0.0, 0.5, 1.0
-
-    return (
-        0.70 * sim
-        + 0.15 * genre_jaccard
-        + 0.10 * style_jaccard
-        + 0.05 * quality
-        + 0.03 * lang_bonus
-        - 0.06 * tonal_penalty
-        - 0.05 * runtime_penalty
-        - 0.05 * year_penalty
+    candidates: Sequence[ScoringContext],
+    distances: Sequence[float],
+    vote_counts: Sequence[int | None],
+    inv_log_max_vote: float,
+) -> np.ndarray:
+    """Score many candidates against one anchor; higher is a better match."""
+    n = len(candidates)
+    # `distances` are pgvector cosine distances (<=>), in [0, 2]. Similarity 1 - distance is
+    # clamped into [0, 1]: negative similarities don't help ranking.
+    sim = np.clip(1.0 - np.asarray(distances, dtype=np.float64), 0.0, 1.0)
+
+    # Anchor-only terms are computed once; an empty anchor set scores zero for everyone.
+    anchor_bits = anchor.genre_bits
+    anchor_style = anchor.style
+    genre_jaccard = np.zeros(n)
+    if anchor_bits:
+        genre_jaccard = np.fromiter(
+            (_jaccard_bits(anchor_bits, c.genre_bits) for c in candidates), float, n
+        )
+    style_jaccard = np.zeros(n)
+    if anchor_style:
+        style_jaccard = np.fromiter((_jaccard(anchor_style, c.style) for c in candidates), float, n)
+
+    votes = np.fromiter((v or 0 for v in vote_counts), float, n)
+    quality = np.log1p(votes) * inv_log_max_vote
+
+    lang_bonus = np.zeros(n)
+    anchor_language = anchor.language
+    if anchor_language:
+        lang_bonus = np.fromiter((c.language == anchor_language for c in candidates), float, n)
+
+    mismatch_mask = _tonal_mismatch_mask(anchor_bits)
+    mismatched = np.fromiter(
+        ((c.genre_bits & mismatch_mask).bit_count() for c in candidates), float, n
     )
+    tonal_penalty = np.minimum(mismatched, 2.0) / 2.0
+
+    # Missing values become NaN and then a zero penalty.
+    runtime_penalty = np.zeros(n)
+    if anchor.runtime is not None:
+        runtimes = np.fromiter(
+            (np.nan if c.runtime is None else c.runtime for c in candidates), float, n
+        )
+        runtime_penalty = np.nan_to_num(np.minimum(np.abs(anchor.runtime - runtimes) / 120.0, 1.0))
+
+    year_penalty = np.zeros(n)
+    if anchor.year is not None:
+        years = np.fromiter((np.nan if c.year is None else c.year for c in candidates), float, n)
+        year_penalty = np.nan_to_num(np.minimum(np.abs(anchor.year - years) / 50.0, 1.0))
+
+    features = np.column_stack(
+        (
+            sim,
+            genre_jaccard,
+            style_jaccard,
+            quality,
+            lang_bonus,
+            tonal_penalty,
+            runtime_penalty,
+            year_penalty,
+        )
+    )
+    return features @ _FEATURE_WEIGHTS
 
 
 def rerank_candidates(
@@ -98,7 +169,6 @@ def rerank_candidates(
 ):
     if candidates is None:
         candidates = []
-    max_vote_count = max((c.vote_count or 0) for c in candidates) if candidates else 0
     if anchor_context:
         anchor_ctx = anchor_context
     else:
@@ -112,27 +182,33 @@ def rerank_candidates(
             anchor.original_language,
         )
 
-    for candidate in candidates:
-        candidate_ctx = build_context(
+    contexts = [
+        build_context(
             candidate.genres,
             candidate.keywords,
             candidate.runtime,
             candidate.release_date,
             candidate.original_language,
         )
-        candidate.score = score_candidate(
-            anchor_ctx,
-            candidate_ctx,
-            candidate.distance,
-            candidate.vote_count,
-            max_vote_count,
-        )
+        for candidate in candidates
+    ]
+    vote_counts = [candidate.vote_count or 0 for candidate in candidates]
+    scores = score_candidates(
+        anchor_ctx,
+        contexts,
+        [candidate.distance for candidate in candidates],
+        vote_counts,
+        inverse_log_max_vote(max(vote_counts, default=0)),
+    )
+    for candidate, score in zip(candidates, scores.tolist(), strict=True):
+        candidate.score = score
 
-    candidates.sort(
+    return heapq.nsmallest(
+        top_n,
+        candidates,
         key=lambda item: (
             -(item.score or 0.0),
             item.distance,
             -(item.vote_count or 0),
-        )
+        ),
     )
-    return candidates[:top_n]
@@ -1,4 +1,6 @@
-STYLE_KEYWORDS = {
+import sys
+
+_STYLE_KEYWORDS_RAW = {
     "neo-noir",
     "noir",
     "whodunit",
@@ -60,3 +62,6 @@ STYLE_KEYWORDS = {
     "slice of life",
     "sports drama",
 }
+
+# Interned to match the tokens produced by the keyword parser, so lookups hit on identity.
+STYLE_KEYWORDS: frozenset[str] = frozenset(sys.intern(kw) for kw in _STYLE_KEYWORDS_RAW)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 
 from sqlalchemy import text
 
-from api.db import get_engine
+from api.config import MOVIE_CACHE_MAX_SIZE, MOVIE_CACHE_TTL_S
+from api.db import read_connection
+from api.images import ImageUrlsMixin
 from api.rerank.scorer import rerank_candidates
+from api.ttl_cache import TTLCache
 
 
 class EmbeddingNotFoundError(LookupError):
@@ -14,7 +17,7 @@ class EmbeddingNotFoundError(LookupError):
 
 
 @dataclass
-class MovieMetadata:
+class MovieMetadata(ImageUrlsMixin):
     id: int
     title: str | None
     release_date: date | None
@@ -26,6 +29,8 @@ class MovieMetadata:
     vote_average: float | None
     poster_path: str | None
     backdrop_path: str | None
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
 
 
 @dataclass
@@ -34,112 +39,135 @@ class Candidate(MovieMetadata):
     score: float | None = None
 
 
+_MOVIE_METADATA_CACHE: TTLCache[int, MovieMetadata] = TTLCache(
+    MOVIE_CACHE_MAX_SIZE, MOVIE_CACHE_TTL_S
+)
+
+
+_Q_MOVIE_METADATA = text(
+    """
+    SELECT id,
+           title,
+           release_date,
+           genres,
+           keywords,
+           runtime,
+           original_language,
+           vote_count,
+           vote_average,
+           poster_path,
+           backdrop_path
+    FROM movies
+    WHERE id = :movie_id
+    """
+)
+
+
 def fetch_movie_metadata(movie_id: int) -> MovieMetadata | None:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT id,
-               title,
-               release_date,
-               genres,
-               keywords,
-               runtime,
-               original_language,
-               vote_count,
-               vote_average,
-               poster_path,
-               backdrop_path
-        FROM movies
-        WHERE id = :movie_id
-        """
-    )
-    with engine.begin() as conn:
-        row = conn.execute(q, {"movie_id": movie_id}).mappings().first()
+    cached = _MOVIE_METADATA_CACHE.get(movie_id)
+    if cached is not None:
+        return cached
+    with read_connection() as conn:
+        row = conn.execute(_Q_MOVIE_METADATA, {"movie_id": movie_id}).mappings().first()
     if not row:
         return None
-    return MovieMetadata(**row)
+    movie = MovieMetadata(**row)
+    _MOVIE_METADATA_CACHE.set(movie_id, movie)
+    return movie
+
+
+_Q_FIND_BY_TITLE = text(
+    """
+    SELECT id,
+           title,
+           release_date,
+           genres,
+           keywords,
+           runtime,
+           original_language,
+           vote_count,
+           vote_average,
+           poster_path,
+           backdrop_path
+    FROM movies
+    WHERE lower(title) = lower(:title)
+       OR lower(original_title) = lower(:title)
+       OR title ILIKE :like_title
+       OR original_title ILIKE :like_title
+    ORDER BY
+        CASE
+            WHEN lower(title) = lower(:title) THEN 0
+            WHEN lower(original_title) = lower(:title) THEN 1
+            ELSE 2
+        END,
+        vote_count DESC NULLS LAST
+    LIMIT 1
+    """
+)
 
 
 def find_movie_id_by_title(title: str) -> MovieMetadata | None:
-    engine = get_engine()
     like_title = f"%{title}%"
-    q = text(
-        """
-        SELECT id,
-               title,
-               release_date,
-               genres,
-               keywords,
-               runtime,
-               original_language,
-               vote_count,
-               vote_average,
-               poster_path,
-               backdrop_path
-        FROM movies
-        WHERE lower(title) = lower(:title)
-           OR lower(original_title) = lower(:title)
-           OR title ILIKE :like_title
-           OR original_title ILIKE :like_title
-        ORDER BY
-            CASE
-                WHEN lower(title) = lower(:title) THEN 0
-                WHEN lower(original_title) = lower(:title) THEN 1
-                ELSE 2
-            END,
-            vote_count DESC NULLS LAST
-        LIMIT 1
-        """
-    )
-    with engine.begin() as conn:
-        row = conn.execute(q, {"title": title, "like_title": like_title}).mappings().first()
+    with read_connection() as conn:
+        row = (
+            conn.execute(_Q_FIND_BY_TITLE, {"title": title, "like_title": like_title})
+            .mappings()
+            .first()
+        )
     if not row:
         return None
     return MovieMetadata(**row)
 
 
+_Q_EMBEDDING_EXISTS = text(
+    "SELECT EXISTS (SELECT 1 FROM movie_embeddings WHERE movie_id = :movie_id)"
+)
+
+
 def _ensure_embedding(movie_id: int) -> None:
-    engine = get_engine()
-    q = text("SELECT 1 FROM movie_embeddings WHERE movie_id = :movie_id")
-    with engine.begin() as conn:
-        row = conn.execute(q, {"movie_id": movie_id}).first()
-    if row is None:
+    with read_connection() as conn:
+        exists = conn.execute(_Q_EMBEDDING_EXISTS, {"movie_id": movie_id}).scalar()
+    if not exists:
         raise EmbeddingNotFoundError(f"No embedding for movie_id={movie_id}")
 
 
-def get_similar_candidates(movie_id: int, k: int = 200) -> list[Candidate]:
-    _ensure_embedding(movie_id)
-    engine = get_engine()
-    q = text(
-        """
-        WITH q AS (
-            SELECT embedding
-            FROM movie_embeddings
-            WHERE movie_id = :movie_id
-        )
-        SELECT m.id,
-               m.title,
-               m.release_date,
-               m.genres,
-               m.keywords,
-               m.runtime,
-               m.original_language,
-               m.vote_count,
-               m.vote_average,
-               m.poster_path,
-               m.backdrop_path,
-               (e.embedding <=> q.embedding) AS distance
-        FROM movie_embeddings e
-        JOIN movies m ON m.id = e.movie_id
-        JOIN q ON TRUE
-        WHERE e.movie_id != :movie_id
-        ORDER BY e.embedding <=> q.embedding
-        LIMIT :limit
-        """
+_Q_SIMILAR_CANDIDATES = text(
+    """
+    WITH q AS (
+        SELECT embedding
+        FROM movie_embeddings
+        WHERE movie_id = :movie_id
     )
-    with engine.begin() as conn:
-        rows = conn.execute(q, {"movie_id": movie_id, "limit": k}).mappings().all()
-    return [Candidate(**row) for row in rows]
+    SELECT m.id,
+           m.title,
+           m.release_date,
+           m.genres,
+           m.keywords,
+           m.runtime,
+           m.original_language,
+           m.vote_count,
+           m.vote_average,
+           m.poster_path,
+           m.backdrop_path,
+           (e.embedding <=> q.embedding) AS distance
+    FROM movie_embeddings e
+    JOIN movies m ON m.id = e.movie_id
+    JOIN q ON TRUE
+    WHERE e.movie_id != :movie_id
+    ORDER BY e.embedding <=> q.embedding
+    LIMIT :limit
+    """
+)
+
+
+def get_similar_candidates(movie_id: int, k: int = 200) -> list[Candidate]:
+    with read_connection() as conn:
+        rows = conn.execute(_Q_SIMILAR_CANDIDATES, {"movie_id": movie_id, "limit": k}).all()
+    # A missing anchor embedding also yields no rows, so only an empty result needs the
+    # existence check; the common path is a single round trip.
+    if not rows:
+        _ensure_embedding(movie_id)
+    return [Candidate(*row) for row in rows]
 
 
 def apply_rerank(anchor: MovieMetadata, candidates: list[Candidate], top_n: int) -> list[Candidate]:
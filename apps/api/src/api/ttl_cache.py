@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU cache whose entries expire ``ttl_s`` seconds after insertion.
+
+    Cached values are shared between callers and must be treated as read-only.
+    A ``ttl_s`` of 0 disables the cache.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float) -> None:
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl_s: float | None = None) -> None:
+        """Store ``value``; ``ttl_s`` can only shorten the cache's own TTL for this entry."""
+        if self._ttl_s <= 0:
+            return
+        if ttl_s is not None:
+            ttl_s = min(ttl_s, self._ttl_s)
+            if ttl_s <= 0:
+                return
+        expires_at = time.monotonic() + (self._ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -2,9 +2,14 @@ from __future__ import annotations
 
 from api.users.db import create_user, get_user_summary
 from api.users.match import get_user_movie_match
-from api.users.profile import get_profile_stats, recompute_profile
+from api.users.profile import (
+    get_profile_stats,
+    mark_profile_recompute_pending,
+    recompute_pending_profile,
+    recompute_profile,
+)
 from api.users.queue import get_feed, get_next_movie, get_rating_queue
-from api.users.ratings import get_user_ratings, upsert_rating
+from api.users.ratings import bulk_upsert_ratings, get_user_ratings, upsert_rating
 from api.users.recommendations import get_recommendations, get_recommendations_page
 from api.users.types import (
     FeedItem,
@@ -30,6 +35,7 @@ __all__ = [
     "Recommendation",
     "UserMovieMatch",
     "UserSummary",
+    "bulk_upsert_ratings",
     "create_user",
     "get_feed",
     "get_next_movie",
@@ -40,6 +46,8 @@ __all__ = [
     "get_user_movie_match",
     "get_user_ratings",
     "get_user_summary",
+    "mark_profile_recompute_pending",
+    "recompute_pending_profile",
     "recompute_profile",
     "upsert_rating",
 ]
@@ -1,59 +1,70 @@
 from __future__ import annotations
 
 from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
-from api.db import get_engine
-from api.users.types import MovieNotFoundError, UserNotFoundError, UserSummary
+from api.config import USER_CACHE_MAX_SIZE, USER_CACHE_TTL_S
+from api.db import get_engine, read_connection
+from api.ttl_cache import TTLCache
+from api.users.types import UserNotFoundError, UserSummary
 
+# The API never deletes users, so only positive existence checks are cached; an unknown id is
+# always re-checked against the database.
+_KNOWN_USERS: TTLCache[int, bool] = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_S)
 
-def ensure_user(user_id: int) -> None:
-    engine = get_engine()
-    q = text("SELECT 1 FROM users WHERE id = :user_id")
-    with engine.begin() as conn:
-        row = conn.execute(q, {"user_id": user_id}).first()
-    if row is None:
+_Q_USER_EXISTS = text("SELECT EXISTS (SELECT 1 FROM users WHERE id = :user_id)")
+
+_Q_USER_PROFILE_STATE = text(
+    """
+    SELECT EXISTS (SELECT 1 FROM users WHERE id = :user_id) AS user_exists,
+           EXISTS (SELECT 1 FROM user_profiles WHERE user_id = :user_id) AS has_profile
+    """
+)
+
+
+def ensure_user(user_id: int, conn: Connection | None = None) -> None:
+    if _KNOWN_USERS.get(user_id):
+        return
+    if conn is None:
+        with read_connection() as conn:
+            return ensure_user(user_id, conn)
+    if not conn.execute(_Q_USER_EXISTS, {"user_id": user_id}).scalar():
         raise UserNotFoundError(f"User {user_id} not found")
+    _KNOWN_USERS.set(user_id, True)
 
 
-def ensure_movie(movie_id: int) -> None:
-    engine = get_engine()
-    q = text("SELECT 1 FROM movies WHERE id = :movie_id")
-    with engine.begin() as conn:
-        row = conn.execute(q, {"movie_id": movie_id}).first()
-    if row is None:
-        raise MovieNotFoundError(f"Movie {movie_id} not found")
+_Q_CREATE_USER = text("INSERT INTO users (display_name) VALUES (:display_name) RETURNING id")
 
 
 def create_user(display_name: str | None = None) -> int:
     engine = get_engine()
-    q = text("INSERT INTO users (display_name) VALUES (:display_name) RETURNING id")
     with engine.begin() as conn:
-        row = conn.execute(q, {"display_name": display_name}).first()
+        row = conn.execute(_Q_CREATE_USER, {"display_name": display_name}).first()
     if row is None:
         raise RuntimeError("Failed to create user")
-    return int(row[0])
+    user_id = int(row[0])
+    _KNOWN_USERS.set(user_id, True)
+    return user_id
+
+
+# Timestamps leave the database as ISO 8601 UTC strings, ready for the JSON response.
+_Q_USER_SUMMARY = text(
+    """
+    SELECT u.id,
+           u.display_name,
+           COALESCE(p.num_ratings, 0) AS num_ratings,
+           to_char(p.updated_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')
+             AS profile_updated_at
+    FROM users u
+    LEFT JOIN user_profiles p ON p.user_id = u.id
+    WHERE u.id = :user_id
+    """
+)
 
 
 def get_user_summary(user_id: int) -> UserSummary:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT u.id,
-               u.display_name,
-               COALESCE(p.num_ratings, 0) AS num_ratings,
-               p.updated_at AS profile_updated_at
-        FROM users u
-        LEFT JOIN user_profiles p ON p.user_id = u.id
-        WHERE u.id = :user_id
-        """
-    )
-    with engine.begin() as conn:
-        row = conn.execute(q, {"user_id": user_id}).mappings().first()
+    with read_connection() as conn:
+        row = conn.execute(_Q_USER_SUMMARY, {"user_id": user_id}).first()
     if not row:
         raise UserNotFoundError(f"User {user_id} not found")
-    return UserSummary(
-        id=row["id"],
-        display_name=row["display_name"],
-        num_ratings=row["num_ratings"],
-        profile_updated_at=str(row["profile_updated_at"]) if row["profile_updated_at"] else None,
-    )
+    return UserSummary(*row)
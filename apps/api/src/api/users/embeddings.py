@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import numpy as np
 from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
 from api.config import NEUTRAL_RATING_WEIGHT
-from api.db import get_engine
 
 
 def _profile_weight(rating: int | None) -> float:
@@ -22,71 +23,49 @@ def _dislike_weight(rating: int | None) -> float:
     return 1.0 if rating <= 1 else 0.5
 
 
-def _build_weighted_embedding(rows, weight_fn) -> list[float] | None:
-    if not rows:
-        return None
+def _rating_weights(weight_fn) -> list[float]:
+    """Weights for every valid rating (0-5), for SQL that weighs ratings like ``weight_fn``.
 
-    # Find the first non-None embedding to determine vector length
-    vector_len = None
-    for embedding, _ in rows:
-        if embedding is not None:
-            vector_len = len(embedding)
-            if vector_len == 0:
-                return None
-            break
+    Bound as a ``float8[]``; Postgres arrays are 1-based, so index it with ``rating + 1``.
+    """
+    return [weight_fn(rating) for rating in range(6)]
 
-    if vector_len is None:
-        return None
 
-    totals = [0.0] * vector_len
-    total_weight = 0.0
-
-    for embedding, rating in rows:
-        if embedding is None:
-            continue
-        if len(embedding) != vector_len:
-            continue  # Skip embeddings with mismatched lengths
-        weight = weight_fn(rating)
-        if weight <= 0:
-            continue
-        total_weight += weight
-        for idx, value in enumerate(embedding):
-            totals[idx] += float(value) * weight
-
-    if total_weight <= 0:
-        return None
-    return [value / total_weight for value in totals]
-
-
-def _fetch_profile_embeddings(user_id: int) -> list:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT e.embedding AS embedding,
-               r.rating
-        FROM user_movie_ratings r
-        JOIN movie_embeddings e ON e.movie_id = r.movie_id
-        WHERE r.user_id = :user_id
-          AND r.status = 'watched'
-          AND r.rating >= 3
-        """
-    )
-    with engine.begin() as conn:
-        return list(conn.execute(q, {"user_id": user_id}).all())
-
-
-def _fetch_disliked_embeddings(user_id: int) -> list:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT e.embedding AS embedding,
-               r.rating
+# Weighted mean of disliked embeddings, aggregated in Postgres so only the sum leaves the
+# database rather than one vector per disliked movie. Weights come from _dislike_weight via
+# :rating_weights; embeddings are summed per rating first, see _Q_RECOMPUTE_PROFILE in
+# profile.py for the scaling.
+_Q_DISLIKE_EMBEDDING_SUM = text(
+    """
+    WITH per_weight AS (
+        SELECT sum(e.embedding) AS embedding_sum,
+               count(*) AS num_movies,
+               (CAST(:rating_weights AS float8[]))[r.rating + 1] AS weight
         FROM user_movie_ratings r
         JOIN movie_embeddings e ON e.movie_id = r.movie_id
         WHERE r.user_id = :user_id
           AND r.status = 'watched'
-          AND r.rating <= 2
-        """
+          AND (CAST(:rating_weights AS float8[]))[r.rating + 1] > 0
+        GROUP BY r.rating
     )
-    with engine.begin() as conn:
-        return list(conn.execute(q, {"user_id": user_id}).all())
+    SELECT sum(
+               embedding_sum
+               * array_fill(weight::real, ARRAY[vector_dims(embedding_sum)])::vector
+           ) AS weighted_sum,
+           sum(weight * num_movies) AS total_weight,
+           coalesce(sum(num_movies), 0) AS num_movies
+    FROM per_weight
+    """
+)
+
+
+def _fetch_dislike_embedding(conn: Connection, user_id: int) -> tuple[np.ndarray | None, int]:
+    """Return the weighted mean of the user's disliked embeddings and how many went into it."""
+    row = conn.execute(
+        _Q_DISLIKE_EMBEDDING_SUM,
+        {"user_id": user_id, "rating_weights": _rating_weights(_dislike_weight)},
+    ).one()
+    weighted_sum, total_weight, num_movies = row
+    if weighted_sum is None or not total_weight:
+        return None, int(num_movies)
+    return np.asarray(weighted_sum, dtype=np.float32) / np.float32(total_weight), int(num_movies)
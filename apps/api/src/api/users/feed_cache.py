@@ -12,6 +12,8 @@ class FeedCacheEntry(Generic[T]):
     feed_id: str
     expires_at: float
     items: list[T]
+    # Whatever the items were computed from, so extending the list later stays consistent.
+    inputs: object | None = None
 
 
 class InMemoryTTLCache:
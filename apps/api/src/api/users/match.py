@@ -2,28 +2,36 @@ from __future__ import annotations
 
 from sqlalchemy import text
 
-from api.db import get_engine
-from api.users.db import ensure_movie, ensure_user
-from api.users.types import UserMovieMatch
+from api.db import read_connection
+from api.users.types import MovieNotFoundError, UserMovieMatch, UserNotFoundError
+
+# Both existence checks ride along with the distance, so a match is always one round trip.
+# distance is NULL when the user has no profile or the movie has no embedding.
+_Q_MATCH_DISTANCE = text(
+    """
+    SELECT EXISTS (SELECT 1 FROM users WHERE id = :user_id) AS user_exists,
+           EXISTS (SELECT 1 FROM movies WHERE id = :movie_id) AS movie_exists,
+           (
+               SELECT e.embedding <=> p.embedding
+               FROM user_profiles p
+               JOIN movie_embeddings e ON e.movie_id = :movie_id
+               WHERE p.user_id = :user_id
+           ) AS distance
+    """
+)
 
 
 def get_user_movie_match(user_id: int, movie_id: int) -> UserMovieMatch:
-    ensure_user(user_id)
-    ensure_movie(movie_id)
-    engine = get_engine()
-    q = text(
-        """
-        SELECT (e.embedding <=> p.embedding) AS distance
-        FROM user_profiles p
-        LEFT JOIN movie_embeddings e ON e.movie_id = :movie_id
-        WHERE p.user_id = :user_id
-        """
-    )
-    with engine.begin() as conn:
-        row = conn.execute(q, {"user_id": user_id, "movie_id": movie_id}).first()
-    if not row or row[0] is None:
+    with read_connection() as conn:
+        user_exists, movie_exists, distance = conn.execute(
+            _Q_MATCH_DISTANCE, {"user_id": user_id, "movie_id": movie_id}
+        ).one()
+    if not user_exists:
+        raise UserNotFoundError(f"User {user_id} not found")
+    if not movie_exists:
+        raise MovieNotFoundError(f"Movie {movie_id} not found")
+    if distance is None:
         return UserMovieMatch(score=None)
-    distance = float(row[0])
-    similarity = 1.0 - distance
+    similarity = 1.0 - float(distance)
     score = round(min(100.0, max(0.0, similarity * 100)), 2)
     return UserMovieMatch(score=score)
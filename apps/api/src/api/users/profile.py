@@ -1,97 +1,191 @@
 from __future__ import annotations
 
+import threading
+import time
+
 from sqlalchemy import text
 
-from api.db import get_engine
-from api.users.db import ensure_user
-from api.users.embeddings import (
-    _build_weighted_embedding,
-    _fetch_profile_embeddings,
-    _profile_weight,
-)
-from api.users.ratings import _count_liked_ratings, _count_watched_ratings
+from api.db import get_engine, read_connection
+from api.users.embeddings import _profile_weight, _rating_weights
 from api.users.recommendations import invalidate_recommendations_cache
-from api.users.types import ProfileStats
+from api.users.types import ProfileStats, UserNotFoundError
 
+# Users with a background recompute that has been queued but not started yet.
+# User id -> when its queued recompute was scheduled. A task that never ran (response failed,
+# client gone, shutdown) would otherwise suppress recomputes for that user forever, so entries
+# older than this are treated as lost.
+_PENDING_RECOMPUTE_STALE_S = 5.0
+_PENDING_RECOMPUTES: dict[int, float] = {}
+_PENDING_RECOMPUTES_LOCK = threading.Lock()
 
-def recompute_profile(user_id: int) -> None:
-    ensure_user(user_id)
-    rows = _fetch_profile_embeddings(user_id)
-    num_ratings = _count_watched_ratings(user_id)
-    if not rows:
-        invalidate_recommendations_cache(user_id)
-        engine = get_engine()
-        with engine.begin() as conn:
-            conn.execute(
-                text("DELETE FROM user_profiles WHERE user_id = :user_id"), {"user_id": user_id}
-            )
-        return
-
-    averaged = _build_weighted_embedding(rows, _profile_weight)
-    if averaged is None:
-        return
 
-    engine = get_engine()
-    q = text(
-        """
-        INSERT INTO user_profiles (user_id, embedding, num_ratings, updated_at)
-        VALUES (:user_id, :embedding, :num_ratings, now())
+# Recomputes a profile in one statement: the weighted centroid is built and upserted in
+# Postgres, or the profile is deleted when no rating carries positive weight. Weights depend
+# only on the rating and are bound from _profile_weight as :rating_weights, so embeddings are
+# summed per rating first and only those few sums are scaled; pgvector has no vector-by-scalar
+# operator, hence the array_fill casts. The statement returns whether the user exists and writes nothing when they don't.
+#
+# The profile stores a digest of everything the centroid depends on (each rated movie's rating
+# and embedding version, plus the rating weights). When it still matches, the recompute is a
+# no-op: nothing is aggregated or written. A content digest is used rather than comparing
+# timestamps because now() is the transaction start, so a rating committed during a recompute
+# can carry an older updated_at than the profile that missed it.
+_Q_RECOMPUTE_PROFILE = text(
+    """
+    WITH rating_set AS (
+        SELECT count(*) AS num_ratings,
+               md5(
+                   CAST(CAST(:rating_weights AS float8[]) AS text)
+                   || '|'
+                   || coalesce(
+                       string_agg(
+                           concat_ws(':', r.movie_id, r.rating, e.created_at),
+                           ',' ORDER BY r.movie_id
+                       ),
+                       ''
+                   )
+               ) AS digest
+        FROM user_movie_ratings r
+        LEFT JOIN movie_embeddings e ON e.movie_id = r.movie_id
+        WHERE r.user_id = :user_id
+          AND r.status = 'watched'
+          AND r.rating IS NOT NULL
+    ),
+    unchanged AS (
+        SELECT 1
+        FROM user_profiles p
+        JOIN rating_set s ON s.digest = p.ratings_digest
+        WHERE p.user_id = :user_id
+    ),
+    per_rating AS (
+        SELECT sum(e.embedding) AS embedding_sum,
+               count(*) AS num_movies,
+               (CAST(:rating_weights AS float8[]))[r.rating + 1] AS weight
+        FROM user_movie_ratings r
+        JOIN movie_embeddings e ON e.movie_id = r.movie_id
+        WHERE r.user_id = :user_id
+          AND r.status = 'watched'
+          AND (CAST(:rating_weights AS float8[]))[r.rating + 1] > 0
+        GROUP BY r.rating
+    ),
+    centroid AS (
+        SELECT sum(
+                   embedding_sum
+                   * array_fill(weight::real, ARRAY[vector_dims(embedding_sum)])::vector
+               ) AS weighted_sum,
+               sum(weight * num_movies) AS total_weight
+        FROM per_rating
+    ),
+    upserted AS (
+        INSERT INTO user_profiles (user_id, embedding, num_ratings, ratings_digest, updated_at)
+        SELECT :user_id,
+               weighted_sum
+               * array_fill((1 / total_weight)::real, ARRAY[vector_dims(weighted_sum)])::vector,
+               (SELECT num_ratings FROM rating_set),
+               (SELECT digest FROM rating_set),
+               now()
+        FROM centroid
+        WHERE NOT EXISTS (SELECT 1 FROM unchanged)
+          AND total_weight > 0
+          AND EXISTS (SELECT 1 FROM users WHERE id = :user_id)
         ON CONFLICT (user_id)
         DO UPDATE SET embedding = EXCLUDED.embedding,
                       num_ratings = EXCLUDED.num_ratings,
+                      ratings_digest = EXCLUDED.ratings_digest,
                       updated_at = now()
-        """
+        RETURNING user_id
+    ),
+    deleted AS (
+        DELETE FROM user_profiles
+        WHERE user_id = :user_id
+          AND NOT EXISTS (SELECT 1 FROM unchanged)
+          AND NOT EXISTS (SELECT 1 FROM centroid WHERE total_weight > 0)
+        RETURNING user_id
     )
+    SELECT EXISTS (SELECT 1 FROM users WHERE id = :user_id) AS user_exists,
+           EXISTS (SELECT 1 FROM unchanged) AS unchanged
+    """
+)
+
+
+def recompute_profile(user_id: int) -> None:
+    engine = get_engine()
     with engine.begin() as conn:
-        conn.execute(
-            q,
-            {
-                "user_id": user_id,
-                "embedding": averaged,
-                "num_ratings": num_ratings,
-            },
-        )
+        user_exists, unchanged = conn.execute(
+            _Q_RECOMPUTE_PROFILE,
+            {"user_id": user_id, "rating_weights": _rating_weights(_profile_weight)},
+        ).one()
+    if not user_exists:
+        raise UserNotFoundError(f"User {user_id} not found")
 
-    invalidate_recommendations_cache(user_id)
+    if not unchanged:
+        invalidate_recommendations_cache(user_id)
+
+
+def mark_profile_recompute_pending(user_id: int) -> bool:
+    """Return False if a queued recompute for this user has not started yet.
+
+    That recompute reads ratings when it starts, so it will already include the caller's change.
+    """
+    now = time.monotonic()
+    with _PENDING_RECOMPUTES_LOCK:
+        scheduled_at = _PENDING_RECOMPUTES.get(user_id)
+        if scheduled_at is not None and now - scheduled_at < _PENDING_RECOMPUTE_STALE_S:
+            return False
+        _PENDING_RECOMPUTES[user_id] = now
+        return True
+
+
+def recompute_pending_profile(user_id: int) -> None:
+    with _PENDING_RECOMPUTES_LOCK:
+        _PENDING_RECOMPUTES.pop(user_id, None)
+    recompute_profile(user_id)
+
+
+# User check, profile row and both rating counts in one round trip; no row means no user.
+_Q_PROFILE_STATS = text(
+    """
+    SELECT u.id AS user_id,
+           p.user_id AS profile_user_id,
+           p.num_ratings,
+           to_char(p.updated_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')
+             AS updated_at,
+           vector_norm(p.embedding) AS embedding_norm,
+           c.num_watched,
+           c.num_liked
+    FROM users u
+    LEFT JOIN user_profiles p ON p.user_id = u.id
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) FILTER (WHERE rating IS NOT NULL) AS num_watched,
+               COUNT(*) FILTER (WHERE rating >= 4) AS num_liked
+        FROM user_movie_ratings
+        WHERE user_id = u.id
+          AND status = 'watched'
+    ) c
+    WHERE u.id = :user_id
+    """
+)
 
 
 def get_profile_stats(user_id: int) -> ProfileStats:
-    ensure_user(user_id)
-    engine = get_engine()
-    q = text(
-        """
-        SELECT p.user_id,
-               p.num_ratings,
-               p.updated_at,
-               p.embedding AS embedding
-        FROM user_profiles p
-        WHERE p.user_id = :user_id
-        """
-    )
-    with engine.begin() as conn:
-        row = conn.execute(q, {"user_id": user_id}).mappings().first()
+    with read_connection() as conn:
+        row = conn.execute(_Q_PROFILE_STATS, {"user_id": user_id}).mappings().first()
+    if row is None:
+        raise UserNotFoundError(f"User {user_id} not found")
 
-    if not row:
-        num_ratings = _count_watched_ratings(user_id)
-        num_liked = _count_liked_ratings(user_id)
+    if row["profile_user_id"] is None:
         return ProfileStats(
             user_id=user_id,
-            num_ratings=num_ratings,
-            num_liked=num_liked,
+            num_ratings=int(row["num_watched"]),
+            num_liked=int(row["num_liked"]),
             embedding_norm=None,
             updated_at=None,
         )
 
-    embedding = row["embedding"]
-    norm = None
-    if embedding is not None:
-        norm = sum(float(value) ** 2 for value in embedding) ** 0.5
-
-    num_liked = _count_liked_ratings(user_id)
     return ProfileStats(
         user_id=row["user_id"],
         num_ratings=row["num_ratings"],
-        num_liked=num_liked,
-        embedding_norm=norm,
-        updated_at=str(row["updated_at"]) if row["updated_at"] else None,
+        num_liked=int(row["num_liked"]),
+        embedding_norm=row["embedding_norm"],
+        updated_at=row["updated_at"],
     )
@@ -3,152 +3,132 @@ from __future__ import annotations
 from sqlalchemy import text
 
 from api.config import USER_UNWATCHED_COOLDOWN_DAYS
-from api.db import get_engine
-from api.users.db import ensure_user
+from api.db import read_connection
+from api.users.db import _Q_USER_PROFILE_STATE, ensure_user
 from api.users.recommendations import get_recommendations_page
-from api.users.types import FeedItem, NextMovie, RatingQueueItem
+from api.users.types import FeedItem, NextMovie, RatingQueueItem, UserNotFoundError
+
+# Unknown users get no rows (user 0 is the guest queue), so the existence probe only runs when
+# the result is empty.
+_Q_RATING_QUEUE = text(
+    """
+    SELECT m.id,
+           m.title,
+           m.release_date,
+           m.genres,
+           m.poster_path,
+           m.backdrop_path
+    FROM movies m
+    LEFT JOIN user_movie_ratings r
+      ON r.movie_id = m.id
+     AND r.user_id = :user_id
+    WHERE (:user_id = 0 OR EXISTS (SELECT 1 FROM users WHERE id = :user_id))
+      AND (
+        r.movie_id IS NULL
+        OR (r.status = 'unwatched' AND r.updated_at < now() - make_interval(days => :cooldown_days))
+      )
+    ORDER BY m.vote_count DESC NULLS LAST
+    LIMIT :limit
+    OFFSET :offset
+    """
+)
 
 
 def get_rating_queue(user_id: int, limit: int, offset: int = 0) -> list[RatingQueueItem]:
-    if user_id != 0:
-        ensure_user(user_id)
-    engine = get_engine()
-    q = text(
-        """
+    with read_connection() as conn:
+        rows = conn.execute(
+            _Q_RATING_QUEUE,
+            {
+                "user_id": user_id,
+                "limit": limit,
+                "offset": offset,
+                "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS,
+            },
+        ).all()
+        if not rows and user_id != 0:
+            ensure_user(user_id, conn)
+    return [RatingQueueItem(*row) for row in rows]
+
+
+# One round trip for both sources: the popularity branch only runs when the profile branch
+# (nearest unrated movie to the profile embedding; empty without a profile) found nothing,
+# since UNION ALL stops at the first row. No row means no user, or nothing left to rate.
+_Q_NEXT_MOVIE = text(
+    """
+    WITH profile_pick AS (
         SELECT m.id,
                m.title,
                m.release_date,
                m.genres,
                m.poster_path,
-               m.backdrop_path
-        FROM movies m
-        LEFT JOIN user_movie_ratings r
-          ON r.movie_id = m.id
-         AND r.user_id = :user_id
-        WHERE r.movie_id IS NULL
-           OR (r.status = 'unwatched' AND r.updated_at < now() - make_interval(days => :cooldown_days))
-        ORDER BY m.vote_count DESC NULLS LAST
-        LIMIT :limit
-        OFFSET :offset
-        """
-    )
-    with engine.begin() as conn:
-        rows = (
-            conn.execute(
-                q,
-                {
-                    "user_id": user_id,
-                    "limit": limit,
-                    "offset": offset,
-                    "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS,
-                },
-            )
-            .mappings()
-            .all()
-        )
-    return [RatingQueueItem(**row) for row in rows]
-
-
-def _get_next_from_recs(user_id: int) -> NextMovie | None:
-    engine = get_engine()
-    q_embedding = text("SELECT embedding FROM user_profiles WHERE user_id = :user_id")
-    q = text(
-        """
-        SELECT m.id,
-               m.title,
-               m.release_date,
-               m.genres,
-               m.poster_path,
-               m.backdrop_path
+               m.backdrop_path,
+               'profile' AS source
         FROM movie_embeddings e
         JOIN movies m ON m.id = e.movie_id
-        LEFT JOIN user_movie_ratings r
-          ON r.movie_id = m.id
-         AND r.user_id = :user_id
-        WHERE r.movie_id IS NULL
-           OR (r.status = 'unwatched' AND r.updated_at < now() - make_interval(days => :cooldown_days))
-        ORDER BY e.embedding <=> :embedding
+        WHERE EXISTS (SELECT 1 FROM user_profiles WHERE user_id = :user_id)
+          AND NOT EXISTS (
+            SELECT 1
+            FROM user_movie_ratings r
+            WHERE r.user_id = :user_id
+              AND r.movie_id = e.movie_id
+              AND (
+                r.status <> 'unwatched'
+                OR r.updated_at >= now() - make_interval(days => :cooldown_days)
+              )
+          )
+        ORDER BY e.embedding <=> (SELECT embedding FROM user_profiles WHERE user_id = :user_id)
         LIMIT 1
-        """
     )
-
-    with engine.begin() as conn:
-        embedding = conn.execute(q_embedding, {"user_id": user_id}).scalar()
-        if embedding is None:
-            return None
-
-        row = (
-            conn.execute(
-                q,
-                {
-                    "user_id": user_id,
-                    "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS,
-                    "embedding": embedding,
-                },
-            )
-            .mappings()
-            .first()
-        )
-
-    if not row:
-        return None
-
-    return NextMovie(source="profile", **row)
-
-
-def _get_next_from_popularity(user_id: int) -> NextMovie | None:
-    engine = get_engine()
-    q = text(
-        """
+    SELECT * FROM profile_pick
+    UNION ALL
+    (
         SELECT m.id,
                m.title,
                m.release_date,
                m.genres,
                m.poster_path,
-               m.backdrop_path
+               m.backdrop_path,
+               'popularity' AS source
         FROM movies m
-        LEFT JOIN user_movie_ratings r
-          ON r.movie_id = m.id
-         AND r.user_id = :user_id
-        WHERE r.movie_id IS NULL
-           OR (r.status = 'unwatched' AND r.updated_at < now() - make_interval(days => :cooldown_days))
+        WHERE NOT EXISTS (SELECT 1 FROM profile_pick)
+          AND EXISTS (SELECT 1 FROM users WHERE id = :user_id)
+          AND NOT EXISTS (
+            SELECT 1
+            FROM user_movie_ratings r
+            WHERE r.user_id = :user_id
+              AND r.movie_id = m.id
+              AND (
+                r.status <> 'unwatched'
+                OR r.updated_at >= now() - make_interval(days => :cooldown_days)
+              )
+          )
         ORDER BY m.vote_count DESC NULLS LAST
         LIMIT 1
-        """
     )
-    with engine.begin() as conn:
-        row = (
-            conn.execute(
-                q,
-                {
-                    "user_id": user_id,
-                    "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS,
-                },
-            )
-            .mappings()
-            .first()
-        )
-    if not row:
-        return None
-    return NextMovie(source="popularity", **row)
+    LIMIT 1
+    """
+)
 
 
 def get_next_movie(user_id: int) -> NextMovie | None:
-    ensure_user(user_id)
-    next_movie = _get_next_from_recs(user_id)
-    if next_movie:
-        return next_movie
-    return _get_next_from_popularity(user_id)
+    with read_connection() as conn:
+        row = conn.execute(
+            _Q_NEXT_MOVIE,
+            {"user_id": user_id, "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS},
+        ).first()
+        if not row:
+            ensure_user(user_id, conn)
+            return None
+    return NextMovie(*row)
 
 
 def get_feed(
     user_id: int, limit: int, offset: int = 0
 ) -> tuple[list[FeedItem], dict[str, object] | None]:
-    ensure_user(user_id)
-    engine = get_engine()
-    q_profile = text("SELECT 1 FROM user_profiles WHERE user_id = :user_id")
-    with engine.begin() as conn:
-        has_profile = conn.execute(q_profile, {"user_id": user_id}).first() is not None
+    with read_connection() as conn:
+        user_exists, has_profile = conn.execute(_Q_USER_PROFILE_STATE, {"user_id": user_id}).one()
+    if not user_exists:
+        raise UserNotFoundError(f"User {user_id} not found")
 
     if has_profile:
         recs, meta = get_recommendations_page(user_id, limit, offset)
@@ -1,101 +1,130 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
+
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from api.db import get_engine, read_connection
+from api.users.db import ensure_user
+from api.users.recommendations import invalidate_recommendations_cache
+from api.users.types import MovieNotFoundError, RatedMovie, UserNotFoundError
+
+_Q_UPSERT_RATING = text(
+    """
+    INSERT INTO user_movie_ratings (user_id, movie_id, rating, status)
+    VALUES (:user_id, :movie_id, :rating, :status)
+    ON CONFLICT (user_id, movie_id)
+    DO UPDATE SET rating = EXCLUDED.rating,
+                  status = EXCLUDED.status,
+                  updated_at = now()
+    """
+)
+
 
-from api.db import get_engine
-from api.users.db import ensure_movie, ensure_user
-from api.users.types import RatedMovie
+# Default names Postgres gives the foreign keys declared on user_movie_ratings.
+_USER_FK = "user_movie_ratings_user_id_fkey"
+_MOVIE_FK = "user_movie_ratings_movie_id_fkey"
+
+
+def _raise_not_found(exc: IntegrityError, user_id: int, movie_message: str) -> None:
+    constraint = getattr(getattr(exc.orig, "diag", None), "constraint_name", None)
+    if constraint == _USER_FK:
+        raise UserNotFoundError(f"User {user_id} not found") from exc
+    if constraint == _MOVIE_FK:
+        raise MovieNotFoundError(movie_message) from exc
 
 
 def upsert_rating(user_id: int, movie_id: int, rating: int | None, status: str) -> None:
-    ensure_user(user_id)
-    ensure_movie(movie_id)
+    # The foreign keys do the existence checks, so the write is a single round trip.
     engine = get_engine()
-    q = text(
-        """
-        INSERT INTO user_movie_ratings (user_id, movie_id, rating, status)
-        VALUES (:user_id, :movie_id, :rating, :status)
-        ON CONFLICT (user_id, movie_id)
-        DO UPDATE SET rating = EXCLUDED.rating,
-                      status = EXCLUDED.status,
-                      updated_at = now()
-        """
-    )
-    with engine.begin() as conn:
-        conn.execute(
-            q,
-            {
-                "user_id": user_id,
-                "movie_id": movie_id,
-                "rating": rating,
-                "status": status,
-            },
-        )
-
-
-def _count_watched_ratings(user_id: int) -> int:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT COUNT(*)
-        FROM user_movie_ratings
-        WHERE user_id = :user_id
-          AND status = 'watched'
-          AND rating IS NOT NULL
-        """
-    )
-    with engine.begin() as conn:
-        return int(conn.execute(q, {"user_id": user_id}).scalar() or 0)
-
-
-def _count_liked_ratings(user_id: int) -> int:
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                _Q_UPSERT_RATING,
+                {
+                    "user_id": user_id,
+                    "movie_id": movie_id,
+                    "rating": rating,
+                    "status": status,
+                },
+            )
+    except IntegrityError as exc:
+        _raise_not_found(exc, user_id, f"Movie {movie_id} not found")
+        raise
+    # The cached list may include this movie; drop it now rather than waiting for the
+    # background profile recompute.
+    invalidate_recommendations_cache(user_id)
+
+
+_Q_BULK_UPSERT_RATINGS = text(
+    """
+    INSERT INTO user_movie_ratings (user_id, movie_id, rating, status)
+    SELECT :user_id, t.movie_id, t.rating, t.status
+    FROM unnest(
+        CAST(:movie_ids AS bigint[]),
+        CAST(:ratings AS int[]),
+        CAST(:statuses AS text[])
+    ) AS t(movie_id, rating, status)
+    ON CONFLICT (user_id, movie_id)
+    DO UPDATE SET rating = EXCLUDED.rating,
+                  status = EXCLUDED.status,
+                  updated_at = now()
+    """
+)
+
+
+def bulk_upsert_ratings(user_id: int, items: Iterable[tuple[int, int | None, str]]) -> int:
+    """Upsert ``(movie_id, rating, status)`` items for one user in a single statement.
+
+    Later items win when a movie repeats, since ON CONFLICT can't touch a row twice.
+    Returns the number of distinct movies written.
+    """
+    latest = {movie_id: (rating, status) for movie_id, rating, status in items}
+    if not latest:
+        return 0
+    params = {
+        "user_id": user_id,
+        "movie_ids": list(latest),
+        "ratings": [rating for rating, _status in latest.values()],
+        "statuses": [status for _rating, status in latest.values()],
+    }
     engine = get_engine()
-    q = text(
-        """
-        SELECT COUNT(*)
-        FROM user_movie_ratings
-        WHERE user_id = :user_id
-          AND status = 'watched'
-          AND rating >= 4
-        """
-    )
-    with engine.begin() as conn:
-        return int(conn.execute(q, {"user_id": user_id}).scalar() or 0)
+    try:
+        with engine.begin() as conn:
+            conn.execute(_Q_BULK_UPSERT_RATINGS, params)
+    except IntegrityError as exc:
+        _raise_not_found(exc, user_id, "One or more movies not found")
+        raise
+    invalidate_recommendations_cache(user_id)
+    return len(latest)
+
+
+_Q_USER_RATINGS = text(
+    """
+    SELECT m.id,
+           m.title,
+           m.poster_path,
+           m.backdrop_path,
+           r.rating,
+           r.status,
+           to_char(r.updated_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS updated_at
+    FROM user_movie_ratings r
+    JOIN movies m ON m.id = r.movie_id
+    WHERE r.user_id = :user_id
+    ORDER BY r.updated_at DESC NULLS LAST
+    LIMIT :limit
+    OFFSET :offset
+    """
+)
 
 
 def get_user_ratings(user_id: int, limit: int, offset: int = 0) -> list[RatedMovie]:
-    ensure_user(user_id)
-    engine = get_engine()
-    q = text(
-        """
-        SELECT m.id,
-               m.title,
-               m.poster_path,
-               m.backdrop_path,
-               r.rating,
-               r.status,
-               r.updated_at
-        FROM user_movie_ratings r
-        JOIN movies m ON m.id = r.movie_id
-        WHERE r.user_id = :user_id
-        ORDER BY r.updated_at DESC NULLS LAST
-        LIMIT :limit
-        OFFSET :offset
-        """
-    )
-    with engine.begin() as conn:
-        rows = (
-            conn.execute(q, {"user_id": user_id, "limit": limit, "offset": offset}).mappings().all()
-        )
-    return [
-        RatedMovie(
-            id=row["id"],
-            title=row["title"],
-            poster_path=row["poster_path"],
-            backdrop_path=row["backdrop_path"],
-            rating=row["rating"],
-            status=row["status"],
-            updated_at=str(row["updated_at"]) if row["updated_at"] else None,
-        )
-        for row in rows
-    ]
+    with read_connection() as conn:
+        rows = conn.execute(
+            _Q_USER_RATINGS, {"user_id": user_id, "limit": limit, "offset": offset}
+        ).all()
+        # Only an empty page can mean the user doesn't exist.
+        if not rows:
+            ensure_user(user_id, conn)
+    return [RatedMovie(*row) for row in rows]
@@ -3,9 +3,11 @@ from __future__ import annotations
 import logging
 import time
 import uuid
+from dataclasses import dataclass
 
 from pgvector.psycopg import Vector
 from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
 from api.config import (
     DISLIKE_MIN_COUNT,
@@ -15,17 +17,13 @@ from api.config import (
     RECOMMENDATIONS_CACHE_TTL_S,
     USER_UNWATCHED_COOLDOWN_DAYS,
 )
-from api.db import get_engine
-from api.rerank.scorer import build_context, score_candidate
-from api.users.db import ensure_user
-from api.users.embeddings import (
-    _build_weighted_embedding,
-    _dislike_weight,
-    _fetch_disliked_embeddings,
-)
+from api.db import read_connection
+from api.rerank.scorer import ScoringContext, build_context, inverse_log_max_vote, score_candidates
+from api.users.db import _Q_USER_PROFILE_STATE
+from api.users.embeddings import _fetch_dislike_embedding
 from api.users.feed_cache import _CACHE, FeedCacheEntry
 from api.users.scoring import _build_user_dislike_context, _build_user_scoring_context
-from api.users.types import Recommendation
+from api.users.types import Recommendation, UserNotFoundError
 
 
 def _paginate_windows(
@@ -62,139 +60,168 @@ def invalidate_recommendations_cache(user_id: int) -> None:
     _CACHE.delete(_recommendation_cache_key(user_id))
 
 
+# The profile embedding is read by scalar subqueries, so it never leaves the database; they
+# run once per statement as init plans, which keeps the ORDER BY eligible for the vector index.
+# Rated movies are excluded with an anti-join probe on the ratings primary key, so the index
+# scan keeps streaming rows in distance order (see DB_HNSW_ITERATIVE_SCAN) until the window
+# is full.
+# Columns follow Recommendation's field order so rows are built positionally.
+_Q_RECOMMENDATION_WINDOW_WITH_DISLIKE = text(
+    """
+    SELECT m.id,
+           m.title,
+           m.release_date,
+           m.genres,
+           m.keywords,
+           m.runtime,
+           m.original_language,
+           m.vote_count,
+           m.poster_path,
+           m.backdrop_path,
+           (e.embedding <=> (SELECT embedding FROM user_profiles WHERE user_id = :user_id))
+             AS distance,
+           (e.embedding <=> :dislike_embedding) AS dislike_distance,
+           1 - (e.embedding <=> (SELECT embedding FROM user_profiles WHERE user_id = :user_id))
+             AS similarity
+    FROM movie_embeddings e
+    JOIN movies m ON m.id = e.movie_id
+    WHERE EXISTS (SELECT 1 FROM user_profiles WHERE user_id = :user_id)
+      AND NOT EXISTS (
+        SELECT 1
+        FROM user_movie_ratings r
+        WHERE r.user_id = :user_id
+          AND r.movie_id = e.movie_id
+          AND (
+            r.status <> 'unwatched'
+            OR r.updated_at >= now() - make_interval(days => :cooldown_days)
+          )
+      )
+    ORDER BY distance
+    LIMIT :limit
+    OFFSET :offset
+    """
+)
+
+_Q_RECOMMENDATION_WINDOW = text(
+    """
+    SELECT m.id,
+           m.title,
+           m.release_date,
+           m.genres,
+           m.keywords,
+           m.runtime,
+           m.original_language,
+           m.vote_count,
+           m.poster_path,
+           m.backdrop_path,
+           (e.embedding <=> (SELECT embedding FROM user_profiles WHERE user_id = :user_id))
+             AS distance,
+           NULL AS dislike_distance,
+           1 - (e.embedding <=> (SELECT embedding FROM user_profiles WHERE user_id = :user_id))
+             AS similarity
+    FROM movie_embeddings e
+    JOIN movies m ON m.id = e.movie_id
+    WHERE EXISTS (SELECT 1 FROM user_profiles WHERE user_id = :user_id)
+      AND NOT EXISTS (
+        SELECT 1
+        FROM user_movie_ratings r
+        WHERE r.user_id = :user_id
+          AND r.movie_id = e.movie_id
+          AND (
+            r.status <> 'unwatched'
+            OR r.updated_at >= now() - make_interval(days => :cooldown_days)
+          )
+      )
+    ORDER BY distance
+    LIMIT :limit
+    OFFSET :offset
+    """
+)
+
+
 def _fetch_recommendation_window(
+    conn: Connection,
     *,
     user_id: int,
-    embedding,
     dislike_embedding: Vector | None,
     apply_dislike: bool,
     window_size: int,
     window_index: int,
 ) -> list[Recommendation]:
-    engine = get_engine()
-
     if apply_dislike:
-        q = text(
-            """
-            SELECT m.id,
-                   m.title,
-                   m.release_date,
-                   m.genres,
-                   m.keywords,
-                   m.runtime,
-                   m.original_language,
-                   m.vote_count,
-                   m.poster_path,
-                   m.backdrop_path,
-                   (e.embedding <=> :embedding) AS distance,
-                   (e.embedding <=> :dislike_embedding) AS dislike_distance
-            FROM movie_embeddings e
-            JOIN movies m ON m.id = e.movie_id
-            LEFT JOIN user_movie_ratings r
-              ON r.movie_id = m.id
-             AND r.user_id = :user_id
-            WHERE r.movie_id IS NULL
-               OR (r.status = 'unwatched' AND r.updated_at < now() - make_interval(days => :cooldown_days))
-            ORDER BY e.embedding <=> :embedding
-            LIMIT :limit
-            OFFSET :offset
-            """
-        )
+        q = _Q_RECOMMENDATION_WINDOW_WITH_DISLIKE
         params: dict[str, object] = {
             "user_id": user_id,
-            "embedding": embedding,
             "dislike_embedding": dislike_embedding,
             "limit": window_size,
             "offset": window_index * window_size,
             "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS,
         }
     else:
-        q = text(
-            """
-            SELECT m.id,
-                   m.title,
-                   m.release_date,
-                   m.genres,
-                   m.keywords,
-                   m.runtime,
-                   m.original_language,
-                   m.vote_count,
-                   m.poster_path,
-                   m.backdrop_path,
-                   (e.embedding <=> :embedding) AS distance,
-                   NULL AS dislike_distance
-            FROM movie_embeddings e
-            JOIN movies m ON m.id = e.movie_id
-            LEFT JOIN user_movie_ratings r
-              ON r.movie_id = m.id
-             AND r.user_id = :user_id
-            WHERE r.movie_id IS NULL
-               OR (r.status = 'unwatched' AND r.updated_at < now() - make_interval(days => :cooldown_days))
-            ORDER BY e.embedding <=> :embedding
-            LIMIT :limit
-            OFFSET :offset
-            """
-        )
+        q = _Q_RECOMMENDATION_WINDOW
         params = {
             "user_id": user_id,
-            "embedding": embedding,
             "limit": window_size,
             "offset": window_index * window_size,
             "cooldown_days": USER_UNWATCHED_COOLDOWN_DAYS,
         }
 
-    with engine.begin() as conn:
-        rows = conn.execute(q, params).mappings().all()
-
-    return [Recommendation(**row) for row in rows]
+    return [Recommendation(*row) for row in conn.execute(q, params)]
 
 
 def _rerank_candidates(
     *,
-    user_id: int,
+    user_ctx: ScoringContext | None,
     candidates: list[Recommendation],
     apply_dislike: bool,
     dislike_ctx,
 ) -> tuple[list[Recommendation], dict[int, float], dict[int, float]]:
-    user_ctx = _build_user_scoring_context(user_id)
     if not user_ctx:
-        for item in candidates:
-            item.similarity = 1.0 - item.distance
         return candidates, {}, {}
 
-    max_vote_count = (
-        max((candidate.vote_count or 0) for candidate in candidates) if candidates else 0
-    )
-    like_scores: dict[int, float] = {}
-    dislike_scores: dict[int, float] = {}
-
-    for candidate in candidates:
-        candidate_ctx = build_context(
+    contexts = [
+        build_context(
             candidate.genres,
             candidate.keywords,
             candidate.runtime,
             candidate.release_date,
             candidate.original_language,
         )
-        like_score = score_candidate(
-            user_ctx,
-            candidate_ctx,
-            candidate.distance,
-            candidate.vote_count,
-            max_vote_count,
-        )
-        dislike_score = None
-        if apply_dislike and candidate.dislike_distance is not None and dislike_ctx is not None:
-            dislike_score = score_candidate(
-                dislike_ctx,
-                candidate_ctx,
-                candidate.dislike_distance,
-                candidate.vote_count,
-                max_vote_count,
-            )
+        for candidate in candidates
+    ]
+    vote_counts = [candidate.vote_count or 0 for candidate in candidates]
+    inv_log_max_vote = inverse_log_max_vote(max(vote_counts, default=0))
+    like = score_candidates(
+        user_ctx,
+        contexts,
+        [candidate.distance for candidate in candidates],
+        vote_counts,
+        inv_log_max_vote,
+    ).tolist()
+
+    dislike: list[float | None] = [None] * len(candidates)
+    if apply_dislike and dislike_ctx is not None:
+        # Candidates without a dislike distance get no dislike score rather than a neutral one.
+        dislike_distances = {
+            i: c.dislike_distance
+            for i, c in enumerate(candidates)
+            if c.dislike_distance is not None
+        }
+        scored = list(dislike_distances)
+        dislike_values = score_candidates(
+            dislike_ctx,
+            [contexts[i] for i in scored],
+            list(dislike_distances.values()),
+            [vote_counts[i] for i in scored],
+            inv_log_max_vote,
+        ).tolist()
+        for i, value in zip(scored, dislike_values, strict=True):
+            dislike[i] = value
 
+    like_scores: dict[int, float] = {}
+    dislike_scores: dict[int, float] = {}
+    for candidate, like_score, dislike_score in zip(candidates, like, dislike, strict=True):
         candidate.score = like_score - DISLIKE_WEIGHT * (dislike_score or 0.0)
-        candidate.similarity = 1.0 - candidate.distance
         like_scores[candidate.id] = like_score
         if dislike_score is not None:
             dislike_scores[candidate.id] = dislike_score
@@ -209,66 +236,93 @@ def _rerank_candidates(
     return candidates, like_scores, dislike_scores
 
 
-def get_recommendations_page(
-    user_id: int, page_size: int, cursor: int
-) -> tuple[list[Recommendation], dict[str, object]]:
-    ensure_user(user_id)
+@dataclass(frozen=True)
+class _RerankInputs:
+    user_ctx: ScoringContext | None
+    dislike_ctx: ScoringContext | None
+    dislike_embedding: Vector | None
+    apply_dislike: bool
+    dislike_count: int
 
-    engine = get_engine()
-    q_profile = text("SELECT embedding AS embedding FROM user_profiles WHERE user_id = :user_id")
-    with engine.begin() as conn:
-        profile = conn.execute(q_profile, {"user_id": user_id}).first()
-    if profile is None:
-        return [], {"next_cursor": None, "has_more": False}
-
-    embedding = profile[0]
 
-    dislike_rows = _fetch_disliked_embeddings(user_id)
+def _load_rerank_inputs(conn: Connection, user_id: int) -> _RerankInputs:
+    raw_dislike_embedding, num_disliked = _fetch_dislike_embedding(conn, user_id)
     dislike_embedding = None
-    if len(dislike_rows) >= DISLIKE_MIN_COUNT:
-        raw_dislike_embedding = _build_weighted_embedding(dislike_rows, _dislike_weight)
-        if raw_dislike_embedding is not None:
-            dislike_embedding = Vector(raw_dislike_embedding)
+    if raw_dislike_embedding is not None and num_disliked >= DISLIKE_MIN_COUNT:
+        dislike_embedding = Vector(raw_dislike_embedding)
 
-    dislike_ctx, dislike_ctx_count = _build_user_dislike_context(user_id)
+    dislike_ctx, dislike_ctx_count = _build_user_dislike_context(conn, user_id)
     apply_dislike = (
         dislike_embedding is not None
         and dislike_ctx is not None
-        and min(len(dislike_rows), dislike_ctx_count) >= DISLIKE_MIN_COUNT
+        and min(num_disliked, dislike_ctx_count) >= DISLIKE_MIN_COUNT
     )
+    return _RerankInputs(
+        user_ctx=_build_user_scoring_context(conn, user_id),
+        dislike_ctx=dislike_ctx,
+        dislike_embedding=dislike_embedding,
+        apply_dislike=apply_dislike,
+        dislike_count=dislike_ctx_count,
+    )
+
 
+def get_recommendations_page(
+    user_id: int, page_size: int, cursor: int
+) -> tuple[list[Recommendation], dict[str, object]]:
     window_size = MAX_FETCH_CANDIDATES
     window_index = cursor // window_size
+    needed_end = (window_index + 1) * window_size
 
     cache_key = _recommendation_cache_key(user_id)
     cached = _CACHE.get(cache_key)
     cached_items: list[Recommendation] = list(cached.items) if cached is not None else []
-
-    needed_end = (window_index + 1) * window_size
-    if len(cached_items) < needed_end:
-        missing_windows_start = len(cached_items) // window_size
-        max_windows = max(1, RECOMMENDATIONS_CACHE_MAX_WINDOWS_PER_REQUEST)
-        for idx in range(missing_windows_start, missing_windows_start + max_windows):
-            window_candidates = _fetch_recommendation_window(
-                user_id=user_id,
-                embedding=embedding,
-                dislike_embedding=dislike_embedding,
-                apply_dislike=apply_dislike,
-                window_size=window_size,
-                window_index=idx,
-            )
-            if not window_candidates:
-                break
-
-            reranked, _like, _dislike = _rerank_candidates(
-                user_id=user_id,
-                candidates=window_candidates,
-                apply_dislike=apply_dislike,
-                dislike_ctx=dislike_ctx,
-            )
-            cached_items.extend(reranked)
-            if len(window_candidates) < window_size:
-                break
+    # An empty cached list is final too: the user had no profile or no candidates left.
+    cache_hit = cached is not None and (not cached_items or len(cached_items) >= needed_end)
+
+    # A cached list already covering this window is served without touching the profile,
+    # dislike context, or candidate queries; rating changes invalidate it.
+    inputs = cached.inputs if cached is not None else None
+    if not isinstance(inputs, _RerankInputs):
+        inputs = None
+    if not cache_hit:
+        # Every query on a miss shares one pooled connection.
+        with read_connection() as conn:
+            # Later windows are scored with the inputs cached alongside the earlier ones, so
+            # paging deeper skips the dislike and scoring-context queries. Candidates require
+            # a profile, so without one those queries are skipped and the empty list cached.
+            if inputs is None:
+                user_exists, has_profile = conn.execute(
+                    _Q_USER_PROFILE_STATE, {"user_id": user_id}
+                ).one()
+                if not user_exists:
+                    raise UserNotFoundError(f"User {user_id} not found")
+                if has_profile:
+                    inputs = _load_rerank_inputs(conn, user_id)
+
+            missing_windows_start = len(cached_items) // window_size
+            max_windows = max(1, RECOMMENDATIONS_CACHE_MAX_WINDOWS_PER_REQUEST)
+            if inputs is not None:
+                for idx in range(missing_windows_start, missing_windows_start + max_windows):
+                    window_candidates = _fetch_recommendation_window(
+                        conn,
+                        user_id=user_id,
+                        dislike_embedding=inputs.dislike_embedding,
+                        apply_dislike=inputs.apply_dislike,
+                        window_size=window_size,
+                        window_index=idx,
+                    )
+                    if not window_candidates:
+                        break
+
+                    reranked, _like, _dislike = _rerank_candidates(
+                        user_ctx=inputs.user_ctx,
+                        candidates=window_candidates,
+                        apply_dislike=inputs.apply_dislike,
+                        dislike_ctx=inputs.dislike_ctx,
+                    )
+                    cached_items.extend(reranked)
+                    if len(window_candidates) < window_size:
+                        break
 
         if RECOMMENDATIONS_CACHE_TTL_S > 0:
             now = time.time()
@@ -276,6 +330,7 @@ def get_recommendations_page(
                 feed_id=str(uuid.uuid4()),
                 expires_at=now + RECOMMENDATIONS_CACHE_TTL_S,
                 items=cached_items,
+                inputs=inputs,
             )
             _CACHE.set(cache_key, entry)
 
@@ -291,8 +346,9 @@ def get_recommendations_page(
             "recommendation_page",
             extra={
                 "user_id": user_id,
-                "apply_dislike": apply_dislike,
-                "dislike_count": dislike_ctx_count,
+                "cache_hit": cache_hit,
+                "apply_dislike": inputs.apply_dislike if inputs else False,
+                "dislike_count": inputs.dislike_count if inputs else 0,
                 "cursor": cursor,
                 "page_size": page_size,
                 "window_size": window_size,
@@ -1,99 +1,134 @@
 from __future__ import annotations
 
-from collections import Counter
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator, Mapping
 
 from sqlalchemy import text
+from sqlalchemy.engine import Connection, RowMapping
 
 from api.config import MAX_SCORING_GENRES, MAX_SCORING_KEYWORDS, SCORING_CONTEXT_LIMIT
-from api.db import get_engine
-from api.rerank.features import extract_year, parse_genres, parse_keywords, style_keywords
-from api.rerank.scorer import ScoringContext
+from api.rerank.features import style_keywords
+from api.rerank.scorer import ScoringContext, build_context
 from api.users.embeddings import _dislike_weight, _profile_weight
 
-
-def _fetch_scoring_rows(user_id: int, min_rating: int, max_rating: int) -> list[dict]:
-    engine = get_engine()
-    q = text(
-        """
-        SELECT m.genres,
-               m.keywords,
-               m.runtime,
-               m.release_date,
-               m.original_language,
-               r.rating
-        FROM user_movie_ratings r
-        JOIN movies m ON m.id = r.movie_id
-        WHERE r.user_id = :user_id
-          AND r.status = 'watched'
-          AND r.rating >= :min_rating
-          AND r.rating <= :max_rating
-        ORDER BY r.updated_at DESC
-        LIMIT :limit
-        """
+_Q_SCORING_ROWS = text(
+    """
+    SELECT m.genres,
+           m.keywords,
+           m.runtime,
+           m.release_date,
+           m.original_language,
+           r.rating
+    FROM user_movie_ratings r
+    JOIN movies m ON m.id = r.movie_id
+    WHERE r.user_id = :user_id
+      AND r.status = 'watched'
+      AND r.rating >= :min_rating
+      AND r.rating <= :max_rating
+    ORDER BY r.updated_at DESC
+    LIMIT :limit
+    """
+)
+
+
+def _iter_scoring_rows(
+    conn: Connection, user_id: int, min_rating: int, max_rating: int
+) -> Iterator[RowMapping]:
+    return iter(
+        conn.execute(
+            _Q_SCORING_ROWS,
+            {
+                "user_id": user_id,
+                "min_rating": min_rating,
+                "max_rating": max_rating,
+                "limit": SCORING_CONTEXT_LIMIT,
+            },
+        ).mappings()
     )
-    with engine.begin() as conn:
-        return [
-            dict(row)
-            for row in conn.execute(
-                q,
-                {
-                    "user_id": user_id,
-                    "min_rating": min_rating,
-                    "max_rating": max_rating,
-                    "limit": SCORING_CONTEXT_LIMIT,
-                },
-            ).mappings()
-        ]
-
-
-def _build_weighted_scoring_context(rows: list[dict], weight_fn) -> ScoringContext | None:
-    if not rows:
-        return None
-
-    genre_counts = Counter()
-    keyword_counts = Counter()
-    language_counts = Counter()
+
+
+def _scale_tallies(
+    tallies: dict[float, Counter[str]], first_seen: dict[str, None]
+) -> dict[str, float]:
+    # Keys are seeded in first-seen order (rows come most recent first), so _top breaks ties
+    # by rating recency regardless of which weight a token was tallied under.
+    weighted = dict.fromkeys(first_seen, 0.0)
+    for weight, tally in tallies.items():
+        for token, count in tally.items():
+            weighted[token] += count * weight
+    return weighted
+
+
+def _top(weighted: dict[str, float], n: int) -> list[str]:
+    # sorted() is stable (also with reverse=True), so equal weights keep first-seen order.
+    return sorted(weighted, key=weighted.__getitem__, reverse=True)[:n]
+
+
+def _build_weighted_scoring_context(
+    rows: Iterable[Mapping], weight_fn
+) -> tuple[ScoringContext | None, int]:
+    """Aggregate rated movies in a single pass; also returns how many rows were read."""
+    # Ratings map onto a handful of weights, so tokens are tallied per weight with C-level
+    # Counter.update calls and each tally is scaled once at the end.
+    genre_tallies: defaultdict[float, Counter[str]] = defaultdict(Counter)
+    keyword_tallies: defaultdict[float, Counter[str]] = defaultdict(Counter)
+    language_tallies: defaultdict[float, Counter[str]] = defaultdict(Counter)
+    genres_seen: dict[str, None] = {}
+    keywords_seen: dict[str, None] = {}
+    languages_seen: dict[str, None] = {}
     runtime_total = 0.0
     runtime_weight = 0.0
     year_total = 0.0
     year_weight = 0.0
     total_weight = 0.0
+    count = 0
 
     for row in rows:
+        count += 1
         weight = weight_fn(row.get("rating"))
         if weight <= 0:
             continue
         total_weight += weight
 
-        for genre in parse_genres(row.get("genres")):
-            genre_counts[genre] += weight
-        for keyword in parse_keywords(row.get("keywords")):
-            keyword_counts[keyword] += weight
-
-        runtime = row.get("runtime")
-        if runtime:
-            runtime_total += float(runtime) * weight
+        # Rated movies are usually candidates elsewhere too, so their parsed fields come
+        # from the shared build_context cache instead of being re-split here.
+        movie = build_context(
+            row.get("genres"),
+            row.get("keywords"),
+            row.get("runtime"),
+            row.get("release_date"),
+            row.get("original_language"),
+        )
+        genre_tallies[weight].update(movie.genres)
+        genres_seen.update(dict.fromkeys(movie.genres))
+        keyword_tallies[weight].update(movie.keywords)
+        keywords_seen.update(dict.fromkeys(movie.keywords))
+
+        if movie.runtime:
+            runtime_total += float(movie.runtime) * weight
             runtime_weight += weight
 
-        year = extract_year(row.get("release_date"))
-        if year:
-            year_total += float(year) * weight
+        if movie.year:
+            year_total += float(movie.year) * weight
             year_weight += weight
 
-        language = row.get("original_language")
-        if language:
-            language_counts[str(language).lower()] += weight
+        if movie.language:
+            language_tallies[weight][movie.language] += 1
+            languages_seen.setdefault(movie.language)
 
     if total_weight <= 0:
-        return None
+        return None, count
 
-    top_genres = {g for g, _ in genre_counts.most_common(MAX_SCORING_GENRES)}
-    top_keywords = {k for k, _ in keyword_counts.most_common(MAX_SCORING_KEYWORDS)}
+    genre_counts = _scale_tallies(genre_tallies, genres_seen)
+    keyword_counts = _scale_tallies(keyword_tallies, keywords_seen)
+    language_counts = _scale_tallies(language_tallies, languages_seen)
+    top_genres = set(_top(genre_counts, MAX_SCORING_GENRES))
+    top_keywords = set(_top(keyword_counts, MAX_SCORING_KEYWORDS))
     avg_runtime = int(runtime_total / runtime_weight) if runtime_weight else None
     avg_year = int(year_total / year_weight) if year_weight else None
-    fav_lang = language_counts.most_common(1)[0][0] if language_counts else None
+    fav_lang = next(iter(_top(language_counts, 1)), None)
 
-    return ScoringContext(
+    ctx = ScoringContext(
         genres=top_genres,
         keywords=top_keywords,
         style=style_keywords(top_keywords),
@@ -101,13 +136,17 @@ def _build_weighted_scoring_context(rows: list[dict], weight_fn) -> ScoringConte
         year=avg_year,
         language=fav_lang,
     )
+    return ctx, count
 
 
-def _build_user_scoring_context(user_id: int) -> ScoringContext | None:
-    rows = _fetch_scoring_rows(user_id, min_rating=3, max_rating=5)
-    return _build_weighted_scoring_context(rows, _profile_weight)
+def _build_user_scoring_context(conn: Connection, user_id: int) -> ScoringContext | None:
+    rows = _iter_scoring_rows(conn, user_id, min_rating=3, max_rating=5)
+    ctx, _count = _build_weighted_scoring_context(rows, _profile_weight)
+    return ctx
 
 
-def _build_user_dislike_context(user_id: int) -> tuple[ScoringContext | None, int]:
-    rows = _fetch_scoring_rows(user_id, min_rating=1, max_rating=2)
-    return _build_weighted_scoring_context(rows, _dislike_weight), len(rows)
+def _build_user_dislike_context(
+    conn: Connection, user_id: int
+) -> tuple[ScoringContext | None, int]:
+    rows = _iter_scoring_rows(conn, user_id, min_rating=1, max_rating=2)
+    return _build_weighted_scoring_context(rows, _dislike_weight)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 
+from api.images import ImageUrlsMixin
+
 
 class UserNotFoundError(LookupError):
     pass
@@ -21,7 +23,7 @@ class UserSummary:
 
 
 @dataclass
-class Recommendation:
+class Recommendation(ImageUrlsMixin):
     id: int
     title: str | None
     release_date: date | None
@@ -36,16 +38,20 @@ class Recommendation:
     dislike_distance: float | None = None
     similarity: float | None = None
     score: float | None = None
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
 
 
 @dataclass
-class RatingQueueItem:
+class RatingQueueItem(ImageUrlsMixin):
     id: int
     title: str | None
     release_date: date | None
     genres: str | None
     poster_path: str | None
     backdrop_path: str | None
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
 
 
 @dataclass
@@ -58,7 +64,7 @@ class ProfileStats:
 
 
 @dataclass
-class NextMovie:
+class NextMovie(ImageUrlsMixin):
     id: int
     title: str | None
     release_date: date | None
@@ -66,10 +72,12 @@ class NextMovie:
     poster_path: str | None
     backdrop_path: str | None
     source: str
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
 
 
 @dataclass
-class FeedItem:
+class FeedItem(ImageUrlsMixin):
     id: int
     title: str | None
     release_date: date | None
@@ -80,6 +88,8 @@ class FeedItem:
     similarity: float | None
     score: float | None
     source: str
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
 
 
 @dataclass
@@ -88,7 +98,7 @@ class UserMovieMatch:
 
 
 @dataclass
-class RatedMovie:
+class RatedMovie(ImageUrlsMixin):
     id: int
     title: str | None
     poster_path: str | None
@@ -96,3 +106,5 @@ class RatedMovie:
     rating: int | None
     status: str
     updated_at: str | None
+    poster_url: str | None = field(init=False)
+    backdrop_url: str | None = field(init=False)
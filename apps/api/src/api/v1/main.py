@@ -1,8 +1,9 @@
+import hashlib
 from datetime import date
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, Literal, Self, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, model_validator
 
 from api.auth.db import (
     EmailAlreadyRegisteredError,
@@ -17,14 +18,12 @@ from api.config import (
     KEYCLOAK_AUDIENCE,
     KEYCLOAK_ISSUER_URL,
     KEYCLOAK_JWKS_URL,
+    MOVIE_CACHE_TTL_S,
     SIM_CANDIDATES_K,
     SIM_RERANK_ENABLED,
     SIM_TOP_N,
-    TMDB_BACKDROP_SIZE,
-    TMDB_IMAGE_BASE_URL,
-    TMDB_POSTER_SIZE,
 )
-from api.movies import fetch_movie_detail
+from api.movies import MovieDetail, fetch_movie_detail, fetch_movie_details
 from api.rate_limit import limiter, login_rate_limit, register_rate_limit
 from api.similarity import (
     apply_rerank,
@@ -42,7 +41,8 @@ from api.users import (
     get_user_movie_match,
     get_user_ratings,
     get_user_summary,
-    recompute_profile,
+    mark_profile_recompute_pending,
+    recompute_pending_profile,
     upsert_rating,
 )
 
@@ -56,23 +56,10 @@ class ResponseEnvelope(BaseModel, Generic[ResponseData]):
     meta: dict[str, Any] = Field(default_factory=dict)
 
 
-def _build_image_urls(
-    poster_path: str | None, backdrop_path: str | None
-) -> tuple[str | None, str | None]:
-    poster_url = f"{TMDB_IMAGE_BASE_URL}{TMDB_POSTER_SIZE}{poster_path}" if poster_path else None
-    backdrop_url = (
-        f"{TMDB_IMAGE_BASE_URL}{TMDB_BACKDROP_SIZE}{backdrop_path}" if backdrop_path else None
-    )
-    return poster_url, backdrop_url
-
-
-def _with_image_urls(item) -> dict:
-    poster_url, backdrop_url = _build_image_urls(item.poster_path, item.backdrop_path)
-    return item.__dict__ | {"poster_url": poster_url, "backdrop_url": backdrop_url}
-
-
-def _map_with_image_urls(items, response_cls):
-    return [response_cls(**_with_image_urls(item)) for item in items]
+def _map_rows(items, response_cls):
+    # Rows come from our own queries and already match the response types (including
+    # poster_url/backdrop_url), so skip validation; request bodies are still validated.
+    return [response_cls.model_construct(**item.__dict__) for item in items]
 
 
 def _envelope(
@@ -154,13 +141,21 @@ class AuthTokenResponse(BaseModel):
 
 class RatingRequest(BaseModel):
     rating: int | None = Field(default=None, ge=0, le=5)
-    status: str | None = None
+    status: Literal["watched", "unwatched"] | None = None
+
+    @model_validator(mode="after")
+    def _resolve_status(self) -> Self:
+        if self.rating is None and self.status is None:
+            raise ValueError("rating or status is required")
+        if self.status is None:
+            self.status = "watched"
+        elif self.status == "unwatched":
+            self.rating = None
+        return self
 
 
-class RateMovieRequest(BaseModel):
+class RateMovieRequest(RatingRequest):
     movie_id: int
-    rating: int | None = Field(default=None, ge=0, le=5)
-    status: str | None = None
 
 
 class RecommendationResponse(BaseModel):
@@ -229,23 +224,28 @@ class UserMovieMatchResponse(BaseModel):
     score: float | None
 
 
-def _process_rating(user_id: int, movie_id: int, rating: int | None, status: str | None):
-    if rating is None and status is None:
-        raise HTTPException(status_code=400, detail="rating or status is required")
+def _process_rating(
+    user_id: int, movie_id: int, payload: RatingRequest, background_tasks: BackgroundTasks
+):
+    # RatingRequest has already resolved status and cleared the rating for unwatched; the
+    # None branch only narrows the type.
+    status = payload.status
+    if status is None:
+        raise HTTPException(status_code=422, detail="rating or status is required")
+    upsert_rating(user_id, movie_id, payload.rating, status)
+    # Recompute after the response is sent; rapid ratings share one queued recompute.
+    if mark_profile_recompute_pending(user_id):
+        background_tasks.add_task(recompute_pending_profile, user_id)
+    return _envelope({"status": "ok"})
 
-    resolved_status = status or ("watched" if rating is not None else "unwatched")
-    if resolved_status not in {"watched", "unwatched"}:
-        raise HTTPException(status_code=400, detail="status must be watched or unwatched")
 
-    resolved_rating = rating if resolved_status == "watched" else None
-    upsert_rating(user_id, movie_id, resolved_rating, resolved_status)
-    recompute_profile(user_id)
-    return _envelope({"status": "ok"})
+_HEALTH_BODY = b'{"data":{"status":"ok"},"meta":{}}'
 
 
 @router.get("/health", response_model=ResponseEnvelope[dict[str, str]])
-def health():
-    return _envelope({"status": "ok"})
+async def health():
+    # Async and pre-encoded: no threadpool hop or serialization for a constant body.
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @router.get("/movies/{movie_id}/similar", response_model=ResponseEnvelope[list[SimilarMovie]])
@@ -271,7 +271,7 @@ def similar_movies(
             candidate.score = None
 
     page_candidates, meta = _paginate(ranked[cursor:], cursor, page_size)
-    return _envelope(_map_with_image_urls(page_candidates, SimilarMovie), meta)
+    return _envelope(_map_rows(page_candidates, SimilarMovie), meta)
 
 
 @router.get("/movies/lookup", response_model=ResponseEnvelope[MovieLookup])
@@ -282,14 +282,59 @@ def lookup_movie(title: str = Query(min_length=1)):
     return _envelope(MovieLookup(id=movie.id, title=movie.title))
 
 
+_MOVIE_CACHE_CONTROL = f"public, max-age={MOVIE_CACHE_TTL_S}"
+
+
+def _movie_etag(movie: MovieDetail) -> str:
+    # Content-derived so every worker produces the same tag for the same row.
+    digest = hashlib.blake2b(repr(tuple(movie.__dict__.values())).encode(), digest_size=8)
+    return f'"{movie.id}-{digest.hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 @router.get("/movies/{movie_id}", response_model=ResponseEnvelope[MovieDetailResponse])
-def movie_detail(movie_id: int):
+def movie_detail(movie_id: int, request: Request, response: Response):
     movie = fetch_movie_detail(movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    poster_url, backdrop_url = _build_image_urls(movie.poster_path, movie.backdrop_path)
-    payload = movie.__dict__ | {"poster_url": poster_url, "backdrop_url": backdrop_url}
-    return _envelope(MovieDetailResponse(**payload))
+    etag = _movie_etag(movie)
+    headers = {"ETag": etag, "Cache-Control": _MOVIE_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return _envelope(MovieDetailResponse.model_construct(**movie.__dict__))
+
+
+MAX_BATCH_MOVIE_IDS = 200
+
+
+def _parse_movie_ids(ids: str) -> list[int]:
+    try:
+        movie_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers") from exc
+    # Drop duplicates but keep the caller's order.
+    movie_ids = list(dict.fromkeys(movie_ids))
+    if not movie_ids:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(movie_ids) > MAX_BATCH_MOVIE_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"at most {MAX_BATCH_MOVIE_IDS} ids are allowed"
+        )
+    return movie_ids
+
+
+@router.get("/movies:batch", response_model=ResponseEnvelope[list[MovieDetailResponse]])
+def movie_details_batch(ids: str = Query(min_length=1)):
+    movies = fetch_movie_details(_parse_movie_ids(ids))
+    return _envelope(_map_rows(movies, MovieDetailResponse))
 
 
 def _keycloak_enabled() -> bool:
@@ -365,18 +410,20 @@ def rate_movie(
     user_id: int,
     movie_id: int,
     payload: RatingRequest,
+    background_tasks: BackgroundTasks,
     _auth: int = Depends(require_user_access),
 ):
-    return _process_rating(user_id, movie_id, payload.rating, payload.status)
+    return _process_rating(user_id, movie_id, payload, background_tasks)
 
 
 @router.post("/users/{user_id}/rate", response_model=ResponseEnvelope[dict[str, str]])
 def rate_movie_simple(
     user_id: int,
     payload: RateMovieRequest,
+    background_tasks: BackgroundTasks,
     _auth: int = Depends(require_user_access),
 ):
-    return _process_rating(user_id, payload.movie_id, payload.rating, payload.status)
+    return _process_rating(user_id, payload.movie_id, payload, background_tasks)
 
 
 @router.get(
@@ -390,7 +437,7 @@ def user_recommendations(
     _auth: int = Depends(require_user_access),
 ):
     items, meta = get_recommendations_page(user_id, k, cursor)
-    return _envelope(_map_with_image_urls(items, RecommendationResponse), meta)
+    return _envelope(_map_rows(items, RecommendationResponse), meta)
 
 
 @router.get(
@@ -404,7 +451,7 @@ def rating_queue(
 ):
     queue = get_rating_queue(user_id, k + 1, cursor)
     page_queue, meta = _paginate(queue, cursor, k)
-    return _envelope(_map_with_image_urls(page_queue, RatingQueueResponse), meta)
+    return _envelope(_map_rows(page_queue, RatingQueueResponse), meta)
 
 
 @router.get("/users/{user_id}/ratings", response_model=ResponseEnvelope[list[RatedMovieResponse]])
@@ -416,7 +463,7 @@ def user_ratings(
 ):
     ratings = get_user_ratings(user_id, k + 1, cursor)
     page_ratings, meta = _paginate(ratings, cursor, k)
-    return _envelope(_map_with_image_urls(page_ratings, RatedMovieResponse), meta)
+    return _envelope(_map_rows(page_ratings, RatedMovieResponse), meta)
 
 
 @router.get("/users/{user_id}/profile", response_model=ResponseEnvelope[ProfileStatsResponse])
@@ -430,7 +477,7 @@ def next_movie(user_id: int, _auth: int = Depends(require_user_access)):
     movie = get_next_movie(user_id)
     if movie is None:
         raise HTTPException(status_code=404, detail="No more unrated movies")
-    return _envelope(NextMovieResponse(**_with_image_urls(movie)))
+    return _envelope(NextMovieResponse.model_construct(**movie.__dict__))
 
 
 @router.get("/users/{user_id}/feed", response_model=ResponseEnvelope[list[FeedItemResponse]])
@@ -447,7 +494,7 @@ def user_feed(
         page_items = items
 
     return _envelope(
-        _map_with_image_urls(page_items, FeedItemResponse),
+        _map_rows(page_items, FeedItemResponse),
         meta,
     )
 
@@ -459,7 +506,7 @@ def guest_feed(
 ):
     queue = get_rating_queue(0, k + 1, cursor)
     items = [
-        FeedItemResponse(
+        FeedItemResponse.model_construct(
             id=item.id,
             title=item.title,
             release_date=item.release_date,
@@ -468,8 +515,8 @@ def guest_feed(
             similarity=None,
             score=None,
             source="popularity",
-            poster_url=_build_image_urls(item.poster_path, item.backdrop_path)[0],
-            backdrop_url=_build_image_urls(item.poster_path, item.backdrop_path)[1],
+            poster_url=item.poster_url,
+            backdrop_url=item.backdrop_url,
         )
         for item in queue
     ]
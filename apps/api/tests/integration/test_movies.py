@@ -12,6 +12,18 @@ async def test_get_movie_detail(client: AsyncClient, seeded_movies):  # noqa: AR
     assert "poster_url" in data
 
 
+@pytest.mark.asyncio
+async def test_get_movie_details_batch(client: AsyncClient, seeded_movies):  # noqa: ARG001
+    response = await client.get("/v1/movies:batch?ids=2,999999,1,2")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [movie["id"] for movie in data] == [2, 1]
+    assert data[1]["title"] == "Inception"
+
+    response = await client.get("/v1/movies:batch?ids=1,abc")
+    assert response.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_lookup_movie(client: AsyncClient, seeded_movies):  # noqa: ARG001
     response = await client.get("/v1/movies/lookup?title=Inception")
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import text
+
+from api.config import NEUTRAL_RATING_WEIGHT
+from api.users import create_user, get_rating_queue, recompute_profile, upsert_rating
+from api.users.embeddings import _fetch_dislike_embedding
+from api.users.types import UserNotFoundError
+
+# Seeded movie 1000 + i has a unit embedding along dimension i.
+_E1, _E2, _E3 = 1001, 1002, 1003
+
+
+def _profile_row(db_engine, user_id: int):
+    with db_engine.begin() as conn:
+        return conn.execute(
+            text(
+                "SELECT embedding, num_ratings, ratings_digest, updated_at "
+                "FROM user_profiles WHERE user_id = :user_id"
+            ),
+            {"user_id": user_id},
+        ).fetchone()
+
+
+def test_rating_queue_for_unknown_user_is_not_found(db_session, seeded_movies):  # noqa: ARG001
+    with pytest.raises(UserNotFoundError):
+        get_rating_queue(987654, 10)
+
+
+def test_guest_rating_queue_is_served(db_session, seeded_movies):  # noqa: ARG001
+    assert len(get_rating_queue(0, 10)) == 10
+
+
+def test_recompute_scales_each_rating_by_its_weight(db_session, seeded_movies):  # noqa: ARG001
+    user_id = create_user()
+    upsert_rating(user_id, _E1, 5, "watched")
+    upsert_rating(user_id, _E2, 4, "watched")
+    upsert_rating(user_id, _E3, 3, "watched")
+    upsert_rating(user_id, 1004, 1, "watched")  # no profile weight
+
+    recompute_profile(user_id)
+
+    row = _profile_row(db_session, user_id)
+    assert row is not None
+    embedding, num_ratings = row[0].tolist(), row[1]
+    total = 1.0 + 0.8 + NEUTRAL_RATING_WEIGHT
+    assert embedding[1:5] == pytest.approx(
+        [1.0 / total, 0.8 / total, NEUTRAL_RATING_WEIGHT / total, 0.0], abs=1e-6
+    )
+    assert num_ratings == 4
+
+
+def test_recompute_skips_an_unchanged_rating_set(db_session, seeded_movies):  # noqa: ARG001
+    user_id = create_user()
+    upsert_rating(user_id, _E1, 5, "watched")
+    recompute_profile(user_id)
+    first = _profile_row(db_session, user_id)
+
+    recompute_profile(user_id)
+    assert _profile_row(db_session, user_id)[2:] == first[2:]
+
+    upsert_rating(user_id, _E2, 4, "watched")
+    recompute_profile(user_id)
+    changed = _profile_row(db_session, user_id)
+    assert changed[2] != first[2]
+    assert changed[3] > first[3]
+
+
+def test_recompute_deletes_a_profile_without_weighted_ratings(
+    db_session,
+    seeded_movies,  # noqa: ARG001
+):
+    user_id = create_user()
+    upsert_rating(user_id, _E1, 5, "watched")
+    recompute_profile(user_id)
+    assert _profile_row(db_session, user_id) is not None
+
+    upsert_rating(user_id, _E1, 1, "watched")
+    recompute_profile(user_id)
+    assert _profile_row(db_session, user_id) is None
+
+
+def test_recompute_for_unknown_user_writes_nothing(db_session, seeded_movies):  # noqa: ARG001
+    with pytest.raises(UserNotFoundError):
+        recompute_profile(987654)
+    assert _profile_row(db_session, 987654) is None
+
+
+def test_dislike_embedding_is_the_weighted_mean(db_session, seeded_movies):  # noqa: ARG001
+    user_id = create_user()
+    upsert_rating(user_id, _E1, 1, "watched")
+    upsert_rating(user_id, _E2, 2, "watched")
+    upsert_rating(user_id, _E3, 5, "watched")  # not a dislike
+
+    with db_session.connect() as conn:
+        embedding, num_movies = _fetch_dislike_embedding(conn, user_id)
+
+    assert num_movies == 2
+    assert embedding[1:4].tolist() == pytest.approx([1.0 / 1.5, 0.5 / 1.5, 0.0], abs=1e-6)
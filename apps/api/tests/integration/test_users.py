@@ -123,16 +123,16 @@ async def test_rating_validation(client: AsyncClient, seeded_movies, authed_user
     assert _error_code(response.json()) == "VALIDATION_ERROR"
 
     response = await client.put(f"/v1/users/{user_id}/ratings/{movie_id}", headers=headers, json={})
-    assert response.status_code == 400
-    assert _error_code(response.json()) == "BAD_REQUEST"
+    assert response.status_code == 422
+    assert _error_code(response.json()) == "VALIDATION_ERROR"
 
     response = await client.put(
         f"/v1/users/{user_id}/ratings/{movie_id}",
         headers=headers,
         json={"status": "maybe"},
     )
-    assert response.status_code == 400
-    assert _error_code(response.json()) == "BAD_REQUEST"
+    assert response.status_code == 422
+    assert _error_code(response.json()) == "VALIDATION_ERROR"
 
     response = await client.post(f"/v1/users/{user_id}/rate", headers=headers, json={})
     assert response.status_code == 422
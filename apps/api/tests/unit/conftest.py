@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from types import ModuleType
+
+import pytest
+
+
+class FakeResult:
+    """Canned result for one query: a row, a scalar or a list of rows, as the caller reads it."""
+
+    def __init__(self, value: object) -> None:
+        self._value = value
+
+    def one(self) -> object:
+        return self._value
+
+    def first(self) -> object:
+        return self._value
+
+    def scalar(self) -> object:
+        return self._value
+
+    def all(self) -> object:
+        return self._value or []
+
+    def mappings(self) -> FakeResult:
+        return self
+
+    def __iter__(self):
+        return iter(self._value or [])
+
+
+class FakeConnection:
+    """Answers each ``text()`` query from ``results`` and records what ran.
+
+    It also stands in for the engine (``begin()`` returns itself), and raises ``error`` from
+    every ``execute`` when one is given.
+    """
+
+    def __init__(self, results: dict | None = None, error: Exception | None = None) -> None:
+        self.results = results or {}
+        self.error = error
+        self.executed: list = []
+        self.params: list = []
+        self.checkouts = 0
+
+    def execute(self, query, params=None) -> FakeResult:
+        self.executed.append(query)
+        self.params.append(params)
+        if self.error is not None:
+            raise self.error
+        return FakeResult(self.results.get(query))
+
+    def begin(self) -> FakeConnection:
+        return self
+
+    def __enter__(self) -> FakeConnection:
+        self.checkouts += 1
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        return None
+
+
+@pytest.fixture
+def fake_db(monkeypatch: pytest.MonkeyPatch) -> Callable[..., FakeConnection]:
+    """Point a module's ``read_connection``/``get_engine`` at one shared FakeConnection."""
+
+    def install(
+        *modules: ModuleType, results: dict | None = None, error: Exception | None = None
+    ) -> FakeConnection:
+        conn = FakeConnection(results, error)
+        for module in modules:
+            for name in ("read_connection", "get_engine"):
+                if hasattr(module, name):
+                    monkeypatch.setattr(module, name, lambda: conn)
+        return conn
+
+    return install
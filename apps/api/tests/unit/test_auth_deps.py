@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from httpx import ASGITransport, AsyncClient
+
+import api.auth.deps as deps
+import api.auth.identity as identity
+from api.main import app
+
+
+@pytest.mark.asyncio
+async def test_missing_token_is_unauthorized():
+    transport = ASGITransport(app=app, client=("203.0.113.20", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/v1/auth/me")
+
+    assert resp.status_code == 401
+    assert resp.json()["error"]["code"] == "UNAUTHORIZED"
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_is_unauthorized():
+    transport = ASGITransport(app=app, client=("203.0.113.21", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/v1/auth/me", headers={"Authorization": "Bearer not-a-jwt"})
+
+    assert resp.status_code == 401
+    assert resp.json()["error"]["code"] == "UNAUTHORIZED"
+
+
+@pytest.mark.parametrize(
+    ("subject", "expected"),
+    [
+        ("7", 7),
+        ("007", 7),
+        (" 7", "keycloak: 7"),
+        ("+7", "keycloak:+7"),
+        ("-7", "keycloak:-7"),
+        ("1_0", "keycloak:1_0"),
+        ("²", "keycloak:²"),
+        ("٣", "keycloak:٣"),
+        ("3f2c-uuid", "keycloak:3f2c-uuid"),
+    ],
+)
+def test_only_ascii_digit_subjects_are_local_user_ids(
+    monkeypatch: pytest.MonkeyPatch, subject: str, expected: object
+) -> None:
+    monkeypatch.setattr(deps, "decode_token", lambda _token: {"sub": subject})
+    monkeypatch.setattr(
+        identity,
+        "get_or_create_user_id_for_subject",
+        lambda **kwargs: f"{kwargs['provider']}:{kwargs['subject']}",
+    )
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
+
+    assert deps.get_current_user_id(credentials) == expected
@@ -7,6 +7,8 @@ def test_db_pool_env_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("DB_POOL_TIMEOUT_S", "12")
     monkeypatch.setenv("DB_POOL_RECYCLE_S", "0")
     monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "0")
+    monkeypatch.setenv("DB_PREPARE_THRESHOLD", "0")
+    monkeypatch.setenv("API_THREADPOOL_SIZE", "10")
 
     import importlib
 
@@ -19,6 +21,8 @@ def test_db_pool_env_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
     assert config.DB_POOL_TIMEOUT_S == 12
     assert config.DB_POOL_RECYCLE_S == 0
     assert config.DB_STATEMENT_TIMEOUT_MS == 0
+    assert config.DB_PREPARE_THRESHOLD == 0
+    assert config.API_THREADPOOL_SIZE == 10
 
 
 def test_db_pool_env_validation(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -38,6 +42,7 @@ def test_keycloak_env_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
         "http://keycloak:8080/realms/taste-kid/protocol/openid-connect/certs",
     )
     monkeypatch.setenv("KEYCLOAK_AUDIENCE", "taste-kid-web")
+    monkeypatch.setenv("KEYCLOAK_JWKS_TIMEOUT_S", "2.5")
 
     import importlib
 
@@ -48,3 +53,31 @@ def test_keycloak_env_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
     assert config.KEYCLOAK_ISSUER_URL == "http://localhost:8080/realms/taste-kid"
     assert config.KEYCLOAK_JWKS_URL == "http://keycloak:8080/realms/taste-kid/protocol/openid-connect/certs"
     assert config.KEYCLOAK_AUDIENCE == "taste-kid-web"
+    assert config.KEYCLOAK_JWKS_TIMEOUT_S == 2.5
+
+
+def test_hnsw_ef_search_env_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
+    import importlib
+
+    import api.config
+
+    monkeypatch.setenv("MAX_FETCH_CANDIDATES", "300")
+    config = importlib.reload(api.config)
+    assert config.DB_HNSW_EF_SEARCH == 300
+
+    monkeypatch.setenv("DB_HNSW_EF_SEARCH", "1001")
+    with pytest.raises(ValueError):
+        importlib.reload(api.config)
+
+
+def test_hnsw_iterative_scan_env_validation(monkeypatch: pytest.MonkeyPatch) -> None:
+    import importlib
+
+    import api.config
+
+    monkeypatch.setenv("DB_HNSW_ITERATIVE_SCAN", "Relaxed_Order")
+    assert importlib.reload(api.config).DB_HNSW_ITERATIVE_SCAN == "relaxed_order"
+
+    monkeypatch.setenv("DB_HNSW_ITERATIVE_SCAN", "sometimes")
+    with pytest.raises(ValueError):
+        importlib.reload(api.config)
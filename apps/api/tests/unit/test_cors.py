@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.config import FRONTEND_ORIGINS
+from api.main import app
+
+
+@pytest.mark.asyncio
+async def test_preflight_allows_only_used_methods() -> None:
+    origin = FRONTEND_ORIGINS[0]
+    transport = ASGITransport(app=app, client=("203.0.113.70", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        allowed = await client.options(
+            "/v1/users/1/ratings/1",
+            headers={
+                "Origin": origin,
+                "Access-Control-Request-Method": "PUT",
+                "Access-Control-Request-Headers": "authorization,content-type",
+            },
+        )
+        rejected = await client.options(
+            "/v1/users/1/ratings/1",
+            headers={"Origin": origin, "Access-Control-Request-Method": "DELETE"},
+        )
+
+    assert allowed.status_code == 200
+    assert allowed.headers["access-control-allow-origin"] == origin
+    assert "access-control-allow-credentials" not in allowed.headers
+    assert rejected.status_code == 400
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.main import app
+
+
+@pytest.mark.asyncio
+async def test_health_endpoints_return_constant_json() -> None:
+    transport = ASGITransport(app=app, client=("203.0.113.61", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        root = await client.get("/health")
+        v1 = await client.get("/v1/health")
+
+    assert root.json() == {"status": "ok"}
+    assert root.headers["content-type"] == "application/json"
+    assert v1.json() == {"data": {"status": "ok"}, "meta": {}}
+    for response in (root, v1):
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert "X-Request-ID" not in response.headers
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from api.users.types import RatingQueueItem
+
+
+def test_row_dataclass_builds_image_urls_once() -> None:
+    item = RatingQueueItem(
+        id=1,
+        title="Inception",
+        release_date=None,
+        genres=None,
+        poster_path="/poster.jpg",
+        backdrop_path=None,
+    )
+
+    assert item.poster_url == "https://image.tmdb.org/t/p/w500/poster.jpg"
+    assert item.backdrop_url is None
+    assert item.__dict__["poster_url"] == item.poster_url
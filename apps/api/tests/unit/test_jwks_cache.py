@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import api.auth.jwt as auth_jwt
+from api.ttl_cache import TTLCache
+
+_ISSUER = "http://localhost:8080/realms/taste-kid"
+_AUDIENCE = "taste-kid-web"
+_JWKS_URL = "http://keycloak:8080/realms/taste-kid/protocol/openid-connect/certs"
+
+
+class _FakeResponse:
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    def read(self) -> bytes:
+        return self._body
+
+    def __enter__(self) -> _FakeResponse:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        return None
+
+
+def _jwk(private_key: rsa.RSAPrivateKey, kid: str) -> dict:
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return jwk | {"kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def _token(private_key: rsa.RSAPrivateKey, kid: str) -> str:
+    now = int(time.time())
+    payload = {"sub": "abc", "iss": _ISSUER, "aud": _AUDIENCE, "iat": now, "exp": now + 60}
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def keycloak_env(monkeypatch: pytest.MonkeyPatch) -> dict[str, list]:
+    monkeypatch.setattr(auth_jwt, "KEYCLOAK_ISSUER_URL", _ISSUER)
+    monkeypatch.setattr(auth_jwt, "KEYCLOAK_AUDIENCE", _AUDIENCE)
+    monkeypatch.setattr(auth_jwt, "KEYCLOAK_JWKS_URL", _JWKS_URL)
+    monkeypatch.setattr(auth_jwt, "_JWK_KEY_CACHE", None)
+    monkeypatch.setattr(auth_jwt, "_INVALID_TOKEN_CACHE", TTLCache(max_size=100, ttl_s=30))
+    monkeypatch.setattr(auth_jwt, "_TOKEN_CACHE", TTLCache(max_size=100, ttl_s=60))
+    monkeypatch.setattr(auth_jwt, "_JWKS_MIN_REFRESH_INTERVAL_S", 0.0)
+
+    state: dict[str, list] = {"keys": [], "calls": []}
+
+    def fake_urlopen(url: str, timeout: float) -> _FakeResponse:  # noqa: ARG001
+        state["calls"].append(url)
+        return _FakeResponse(json.dumps({"keys": state["keys"]}).encode("utf-8"))
+
+    monkeypatch.setattr(auth_jwt.urllib.request, "urlopen", fake_urlopen)
+    return state
+
+
+def test_jwks_keys_are_parsed_once(keycloak_env: dict[str, list]) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    keycloak_env["keys"] = [_jwk(private_key, "k1")]
+
+    for _ in range(3):
+        assert auth_jwt.decode_token(_token(private_key, "k1"))["sub"] == "abc"
+
+    assert len(keycloak_env["calls"]) == 1
+
+
+def test_unknown_kid_forces_single_refresh(keycloak_env: dict[str, list]) -> None:
+    old_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    keycloak_env["keys"] = [_jwk(old_key, "old")]
+    auth_jwt.decode_token(_token(old_key, "old"))
+
+    keycloak_env["keys"] = [_jwk(new_key, "new")]
+    assert auth_jwt.decode_token(_token(new_key, "new"))["sub"] == "abc"
+    assert len(keycloak_env["calls"]) == 2
+
+    with pytest.raises(auth_jwt.InvalidTokenError, match="Unknown token key"):
+        auth_jwt.decode_token(_token(new_key, "missing"))
+    assert len(keycloak_env["calls"]) == 3
+
+
+def test_stale_keys_served_while_refreshing(
+    keycloak_env: dict[str, list], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(auth_jwt, "_JWKS_SOFT_TTL_S", 0.0)
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    keycloak_env["keys"] = [_jwk(private_key, "k1")]
+    auth_jwt.decode_token(_token(private_key, "k1"))
+    auth_jwt._TOKEN_CACHE.clear()
+
+    assert auth_jwt.decode_token(_token(private_key, "k1"))["sub"] == "abc"
+    # The background refresh holds the lock until it has stored the new keys.
+    with auth_jwt._JWKS_REFRESH_LOCK:
+        pass
+    assert len(keycloak_env["calls"]) == 2
+
+
+def test_jwks_outage_is_not_negatively_cached(keycloak_env: dict[str, list]) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    token = _token(private_key, "k1")
+    keycloak_env["keys"] = "unavailable"  # type: ignore[assignment]
+
+    with pytest.raises(auth_jwt.InvalidTokenError, match="Invalid JWKS payload"):
+        auth_jwt.decode_token(token)
+
+    keycloak_env["keys"] = [_jwk(private_key, "k1")]
+    assert auth_jwt.decode_token(token)["sub"] == "abc"
+
+
+def test_garbage_token_is_rejected(keycloak_env: dict[str, list]) -> None:  # noqa: ARG001
+    with pytest.raises(auth_jwt.InvalidTokenError, match="Invalid token header"):
+        auth_jwt.decode_token("not-a-jwt")
+
+
+def test_verified_keycloak_token_is_cached(
+    keycloak_env: dict[str, list], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    keycloak_env["keys"] = [_jwk(private_key, "k1")]
+    token = _token(private_key, "k1")
+    assert auth_jwt.decode_token(token)["sub"] == "abc"
+
+    def fail_decode(*_args: object, **_kwargs: object) -> dict:
+        raise AssertionError("cached token should not be verified again")
+
+    monkeypatch.setattr(auth_jwt.jwt, "decode", fail_decode)
+    assert auth_jwt.decode_token(token)["sub"] == "abc"
+
+
+def test_unknown_kid_is_not_negatively_cached(
+    keycloak_env: dict[str, list], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    old_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    keycloak_env["keys"] = [_jwk(old_key, "old")]
+    auth_jwt.decode_token(_token(old_key, "old"))
+
+    # Rotated inside the refresh interval: the new key can't be fetched yet.
+    monkeypatch.setattr(auth_jwt, "_JWKS_MIN_REFRESH_INTERVAL_S", 3600.0)
+    keycloak_env["keys"] = [_jwk(new_key, "new")]
+    token = _token(new_key, "new")
+    with pytest.raises(auth_jwt.InvalidTokenError, match="Unknown token key"):
+        auth_jwt.decode_token(token)
+
+    monkeypatch.setattr(auth_jwt, "_JWKS_MIN_REFRESH_INTERVAL_S", 0.0)
+    assert auth_jwt.decode_token(token)["sub"] == "abc"
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import time
+
+import jwt
+import pytest
+
+import api.auth.jwt as auth_jwt
+from api.ttl_cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def local_jwt(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(auth_jwt, "KEYCLOAK_JWKS_URL", None)
+    monkeypatch.setattr(auth_jwt, "_TOKEN_CACHE", TTLCache(max_size=100, ttl_s=60))
+    monkeypatch.setattr(auth_jwt, "_INVALID_TOKEN_CACHE", TTLCache(max_size=100, ttl_s=30))
+
+
+def test_decoded_token_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = auth_jwt.create_access_token(user_id=42)
+    assert auth_jwt.decode_token(token)["sub"] == "42"
+
+    def fail_decode(*_args: object, **_kwargs: object) -> dict:
+        raise AssertionError("cached token should not be decoded again")
+
+    monkeypatch.setattr(auth_jwt, "_decode_hs256", fail_decode)
+    assert auth_jwt.decode_token(token)["sub"] == "42"
+
+
+def test_invalid_token_is_negatively_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = jwt.encode({"sub": "42"}, "wrong-secret", algorithm="HS256")
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt.decode_token(token)
+    assert auth_jwt._TOKEN_CACHE.get(token) is None
+
+    def fail_decode(_token: str) -> dict:
+        raise AssertionError("known-invalid token should not be verified again")
+
+    monkeypatch.setattr(auth_jwt, "_decode_hs256", fail_decode)
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt.decode_token(token)
+
+
+def test_token_cache_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(auth_jwt, "_TOKEN_CACHE", TTLCache(max_size=2, ttl_s=60))
+    tokens = [auth_jwt.create_access_token(user_id=user_id) for user_id in range(3)]
+    for token in tokens:
+        auth_jwt.decode_token(token)
+
+    assert len(auth_jwt._TOKEN_CACHE) == 2
+    assert auth_jwt._TOKEN_CACHE.get(tokens[0]) is None
+
+
+def test_hs256_fast_path_matches_pyjwt() -> None:
+    token = auth_jwt.create_access_token(user_id=7)
+    expected = jwt.decode(token, auth_jwt.JWT_SECRET_KEY, algorithms=["HS256"])
+    assert auth_jwt._decode_hs256(token) == expected
+
+
+@pytest.mark.parametrize(
+    "payload, key, algorithm",
+    [
+        ({"sub": "7"}, "wrong-secret", "HS256"),
+        ({"sub": "7", "exp": int(time.time()) - 1}, auth_jwt.JWT_SECRET_KEY, "HS256"),
+        ({"sub": "7", "nbf": int(time.time()) + 60}, auth_jwt.JWT_SECRET_KEY, "HS256"),
+        ({"sub": "7"}, auth_jwt.JWT_SECRET_KEY, "HS512"),
+    ],
+)
+def test_hs256_fast_path_rejects_invalid_tokens(payload: dict, key: str, algorithm: str) -> None:
+    token = jwt.encode(payload, key, algorithm=algorithm)
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt._decode_hs256(token)
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b", "a.b.c.d", "..."])
+def test_hs256_fast_path_rejects_malformed_tokens(token: str) -> None:
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt._decode_hs256(token)
+
+
+def test_hs256_fast_path_rejects_tampered_payload() -> None:
+    header, _payload, signature = auth_jwt.create_access_token(user_id=7).split(".")
+    forged = jwt.encode({"sub": "8"}, "other", algorithm="HS256").split(".")[1]
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt._decode_hs256(f"{header}.{forged}.{signature}")
+
+
+def _signed(payload_json: bytes, header_json: bytes = b'{"alg":"HS256","typ":"JWT"}') -> str:
+    def b64(raw: bytes) -> str:
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    header = b64(header_json)
+    signing_input = f"{header}.{b64(payload_json)}"
+    key = auth_jwt.JWT_SECRET_KEY.encode("utf-8")
+    signature = hmac.new(key, signing_input.encode("ascii"), hashlib.sha256).digest()
+    return f"{signing_input}.{b64(signature)}"
+
+
+@pytest.mark.parametrize(
+    "payload_json",
+    [
+        b'{"sub": "7", "exp": "9999999999"}',
+        b'{"sub": "7", "exp": true}',
+        b'{"sub": "7", "exp": 1e400}',
+        b'{"sub": "7", "nbf": null}',
+    ],
+)
+def test_hs256_fast_path_rejects_non_numeric_dates(payload_json: bytes) -> None:
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt._decode_hs256(_signed(payload_json))
+
+
+def test_hs256_fast_path_accepts_float_dates() -> None:
+    exp = time.time() + 60
+    assert auth_jwt._decode_hs256(_signed(f'{{"sub": "7", "exp": {exp}}}'.encode()))["sub"] == "7"
+
+
+@pytest.mark.parametrize(
+    "payload_json, header_json",
+    [
+        (b'{"sub": "7", "aud": "taste-kid"}', b'{"alg":"HS256","typ":"JWT"}'),
+        (b'{"sub": "7", "aud": ["taste-kid"]}', b'{"alg":"HS256","typ":"JWT"}'),
+        (b'{"sub": "7"}', b'{"alg":"HS256","typ":"JWT","crit":["exp"]}'),
+        (b'{"sub": "7"}', b'{"alg":"HS256","typ":"JWT","crit":[]}'),
+    ],
+)
+def test_hs256_fast_path_rejects_audience_and_critical_headers_like_pyjwt(
+    payload_json: bytes, header_json: bytes
+) -> None:
+    token = _signed(payload_json, header_json)
+    with pytest.raises(jwt.PyJWTError):
+        jwt.decode(token, auth_jwt.JWT_SECRET_KEY, algorithms=["HS256"])
+    with pytest.raises(auth_jwt.InvalidTokenError):
+        auth_jwt._decode_hs256(token)
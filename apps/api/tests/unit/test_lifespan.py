@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import pytest
+
+import api.main as api_main
+
+
+@pytest.mark.asyncio
+async def test_lifespan_migrates_on_startup_and_disposes_engine(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+    monkeypatch.setattr(api_main, "_run_startup_migrations", lambda: calls.append("migrate"))
+    monkeypatch.setattr(api_main, "dispose_engine", lambda: calls.append("dispose"))
+
+    async with api_main._lifespan(api_main.app):
+        assert calls == ["migrate"]
+
+    assert calls == ["migrate", "dispose"]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import api.v1.main as v1_main
+from api.main import app
+from api.movies import MovieDetail
+
+
+def _movie() -> MovieDetail:
+    return MovieDetail(
+        id=1,
+        title="Inception",
+        original_title="Inception",
+        release_date=date(2010, 7, 15),
+        genres="Action",
+        overview=None,
+        tagline=None,
+        runtime=148,
+        original_language="en",
+        vote_average=8.8,
+        vote_count=10000,
+        poster_path="/inception.jpg",
+        backdrop_path=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_movie_detail_honors_if_none_match(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(v1_main, "fetch_movie_detail", lambda _movie_id: _movie())
+
+    transport = ASGITransport(app=app, client=("203.0.113.50", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/v1/movies/1")
+        etag = first.headers["etag"]
+        cached = await client.get("/v1/movies/1", headers={"If-None-Match": f'W/"x", {etag}'})
+        changed = await client.get("/v1/movies/1", headers={"If-None-Match": '"1-stale"'})
+
+    assert first.status_code == 200
+    assert etag.startswith('"1-')
+    assert first.headers["cache-control"].startswith("public")
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert changed.status_code == 200
+    assert changed.json()["data"]["title"] == "Inception"
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import api.v1.main as v1_main
+from api.main import app
+
+
+@pytest.fixture
+def requested_ids(monkeypatch: pytest.MonkeyPatch) -> list[list[int]]:
+    calls: list[list[int]] = []
+
+    def fetch_movie_details(movie_ids: list[int]) -> list:
+        calls.append(movie_ids)
+        return []
+
+    monkeypatch.setattr(v1_main, "fetch_movie_details", fetch_movie_details)
+    return calls
+
+
+async def _get(path: str):
+    transport = ASGITransport(app=app, client=("203.0.113.40", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path)
+
+
+@pytest.mark.asyncio
+async def test_batch_ids_are_deduplicated_in_order(requested_ids: list[list[int]]) -> None:
+    resp = await _get("/v1/movies:batch?ids=3, 1,3,2,")
+
+    assert resp.status_code == 200
+    assert requested_ids == [[3, 1, 2]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "ids",
+    ["1,x", ",", ",".join(str(i) for i in range(v1_main.MAX_BATCH_MOVIE_IDS + 1))],
+)
+async def test_batch_rejects_bad_ids(requested_ids: list[list[int]], ids: str) -> None:
+    resp = await _get(f"/v1/movies:batch?ids={ids}")
+
+    assert resp.status_code == 400
+    assert requested_ids == []
@@ -0,0 +1,27 @@
+from passlib.context import CryptContext
+
+from api.auth.passwords import hash_password, verify_password
+
+
+def test_current_hash_verifies_without_upgrade():
+    password_hash = hash_password("password123")
+    assert password_hash.startswith("$argon2id$")
+    assert verify_password("password123", password_hash) == (True, None)
+    assert verify_password("wrong", password_hash) == (False, None)
+
+
+def test_legacy_pbkdf2_hash_is_upgraded():
+    legacy_hash = CryptContext(schemes=["pbkdf2_sha256"]).hash("password123")
+
+    verified, new_hash = verify_password("password123", legacy_hash)
+    assert verified
+    assert new_hash is not None and new_hash.startswith("$argon2id$")
+    assert verify_password("wrong", legacy_hash) == (False, None)
+
+
+def test_outdated_argon2_params_are_upgraded():
+    weaker_hash = CryptContext(schemes=["argon2"], argon2__time_cost=1).hash("password123")
+
+    verified, new_hash = verify_password("password123", weaker_hash)
+    assert verified
+    assert new_hash is not None and verify_password("password123", new_hash) == (True, None)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from api.users.embeddings import (
+    _Q_DISLIKE_EMBEDDING_SUM,
+    _dislike_weight,
+    _fetch_dislike_embedding,
+    _profile_weight,
+    _rating_weights,
+)
+
+
+@pytest.fixture
+def dislike_row(fake_db):
+    def install(row: tuple):
+        return fake_db(results={_Q_DISLIKE_EMBEDDING_SUM: row})
+
+    return install
+
+
+def test_dislike_embedding_is_the_weighted_sum_over_total_weight(dislike_row) -> None:
+    # One rating-1 movie [1, 0] (weight 1.0) and one rating-2 movie [0, 1] (weight 0.5).
+    conn = dislike_row((np.array([1.0, 0.5], dtype=np.float32), 1.5, 2))
+
+    embedding, num_movies = _fetch_dislike_embedding(conn, 7)
+
+    assert conn.executed == [_Q_DISLIKE_EMBEDDING_SUM]
+    assert embedding == pytest.approx([1.0 / 1.5, 0.5 / 1.5])
+    assert num_movies == 2
+
+
+def test_no_disliked_embeddings_is_none(dislike_row) -> None:
+    assert _fetch_dislike_embedding(dislike_row((None, None, 0)), 7) == (None, 0)
+
+
+def test_sql_weights_are_bound_from_the_python_weight_functions(dislike_row) -> None:
+    conn = dislike_row((None, None, 0))
+    _fetch_dislike_embedding(conn, 7)
+
+    assert conn.params[0]["rating_weights"] == [1.0, 1.0, 0.5, 0.0, 0.0, 0.0]
+    assert _rating_weights(_dislike_weight) == conn.params[0]["rating_weights"]
+    assert _rating_weights(_profile_weight)[4:] == [0.8, 1.0]
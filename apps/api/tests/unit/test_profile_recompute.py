@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+import api.users.profile as profile
+from api.users.types import UserNotFoundError
+
+
+def test_pending_recompute_coalesces_until_it_runs(monkeypatch: pytest.MonkeyPatch) -> None:
+    recomputed: list[int] = []
+    monkeypatch.setattr(profile, "_PENDING_RECOMPUTES", {})
+    monkeypatch.setattr(profile, "recompute_profile", recomputed.append)
+
+    assert profile.mark_profile_recompute_pending(42) is True
+    assert profile.mark_profile_recompute_pending(42) is False
+    assert profile.mark_profile_recompute_pending(7) is True
+
+    profile.recompute_pending_profile(42)
+
+    assert recomputed == [42]
+    assert profile.mark_profile_recompute_pending(42) is True
+
+
+def test_pending_recompute_that_never_ran_goes_stale(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(profile.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(profile, "_PENDING_RECOMPUTES", {})
+
+    assert profile.mark_profile_recompute_pending(42) is True
+    # The queued task is never executed.
+    now[0] += profile._PENDING_RECOMPUTE_STALE_S - 1
+    assert profile.mark_profile_recompute_pending(42) is False
+
+    now[0] += 1
+    assert profile.mark_profile_recompute_pending(42) is True
+
+
+@pytest.fixture
+def recompute_row(fake_db, monkeypatch: pytest.MonkeyPatch):
+    """Answer the recompute statement with a canned (user_exists, unchanged) row."""
+
+    def install(user_exists: bool, unchanged: bool = False) -> tuple[list, list]:
+        conn = fake_db(profile, results={profile._Q_RECOMPUTE_PROFILE: (user_exists, unchanged)})
+        invalidated: list[int] = []
+        monkeypatch.setattr(profile, "invalidate_recommendations_cache", invalidated.append)
+        return conn.executed, invalidated
+
+    return install
+
+
+def test_recompute_is_a_single_statement(recompute_row) -> None:
+    executed, invalidated = recompute_row(user_exists=True)
+
+    profile.recompute_profile(42)
+
+    assert executed == [profile._Q_RECOMPUTE_PROFILE]
+    assert invalidated == [42]
+
+
+def test_recompute_for_unknown_user_raises(recompute_row) -> None:
+    _executed, invalidated = recompute_row(user_exists=False)
+
+    with pytest.raises(UserNotFoundError):
+        profile.recompute_profile(42)
+    assert invalidated == []
+
+
+def test_unchanged_rating_set_keeps_cached_recommendations(recompute_row) -> None:
+    executed, invalidated = recompute_row(user_exists=True, unchanged=True)
+
+    profile.recompute_profile(42)
+
+    assert executed == [profile._Q_RECOMPUTE_PROFILE]
+    assert invalidated == []
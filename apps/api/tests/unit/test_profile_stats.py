@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+
+import api.users.profile as profile
+from api.users.types import UserNotFoundError
+
+
+@pytest.fixture
+def stats_row(fake_db):
+    def install(row: dict | None) -> list:
+        return fake_db(profile, results={profile._Q_PROFILE_STATS: row}).executed
+
+    return install
+
+
+def test_stats_without_profile_come_from_one_query(stats_row) -> None:
+    executed = stats_row(
+        {
+            "user_id": 4,
+            "profile_user_id": None,
+            "num_ratings": None,
+            "updated_at": None,
+            "embedding_norm": None,
+            "num_watched": 3,
+            "num_liked": 1,
+        },
+    )
+
+    stats = profile.get_profile_stats(4)
+
+    assert (stats.num_ratings, stats.num_liked, stats.embedding_norm) == (3, 1, None)
+    assert executed == [profile._Q_PROFILE_STATS]
+
+
+def test_stats_use_the_database_computed_norm(stats_row) -> None:
+    stats_row(
+        {
+            "user_id": 4,
+            "profile_user_id": 4,
+            "num_ratings": 5,
+            "updated_at": None,
+            "embedding_norm": 1.5,
+            "num_watched": 5,
+            "num_liked": 2,
+        },
+    )
+
+    stats = profile.get_profile_stats(4)
+
+    assert (stats.num_ratings, stats.num_liked, stats.embedding_norm) == (5, 2, 1.5)
+
+
+def test_stats_for_unknown_user_raise(stats_row) -> None:
+    stats_row(None)
+
+    with pytest.raises(UserNotFoundError):
+        profile.get_profile_stats(4)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+
+from api.v1.main import RateMovieRequest, RatingRequest
+
+
+def test_rating_without_status_is_watched() -> None:
+    payload = RatingRequest(rating=4)
+    assert (payload.rating, payload.status) == (4, "watched")
+
+
+def test_unwatched_status_drops_rating() -> None:
+    payload = RateMovieRequest(movie_id=1, rating=4, status="unwatched")
+    assert (payload.rating, payload.status) == (None, "unwatched")
+
+
+@pytest.mark.parametrize("body", [{}, {"status": "maybe"}, {"rating": 6}])
+def test_invalid_rating_bodies_are_rejected(body: dict) -> None:
+    with pytest.raises(ValidationError):
+        RatingRequest(**body)
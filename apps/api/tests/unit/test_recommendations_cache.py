@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import fields
+
+import pytest
+
+import api.users.recommendations as recs
+from api.users.feed_cache import FeedCacheEntry, InMemoryTTLCache
+from api.users.types import Recommendation, UserNotFoundError
+
+
+def _rec(movie_id: int) -> Recommendation:
+    return Recommendation(
+        id=movie_id,
+        title=f"Movie {movie_id}",
+        release_date=None,
+        genres=None,
+        keywords=None,
+        runtime=None,
+        original_language=None,
+        vote_count=None,
+        poster_path=None,
+        backdrop_path=None,
+        distance=0.5,
+    )
+
+
+def test_cached_window_is_served_without_db(monkeypatch: pytest.MonkeyPatch) -> None:
+    def no_db(*_args: object) -> None:
+        raise AssertionError("cache hit should not query the database")
+
+    cache = InMemoryTTLCache()
+    monkeypatch.setattr(recs, "_CACHE", cache)
+    monkeypatch.setattr(recs, "read_connection", no_db)
+
+    items = [_rec(i) for i in range(recs.MAX_FETCH_CANDIDATES)]
+    cache.set(
+        recs._recommendation_cache_key(5),
+        FeedCacheEntry(feed_id="f", expires_at=time.time() + 60, items=items),
+    )
+
+    page, meta = recs.get_recommendations_page(5, page_size=3, cursor=3)
+
+    assert [item.id for item in page] == [3, 4, 5]
+    assert meta == {"next_cursor": "6", "has_more": True}
+
+    recs.invalidate_recommendations_cache(5)
+    assert cache.get(recs._recommendation_cache_key(5)) is None
+
+
+@pytest.mark.parametrize(
+    "query", [recs._Q_RECOMMENDATION_WINDOW, recs._Q_RECOMMENDATION_WINDOW_WITH_DISLIKE]
+)
+def test_window_columns_follow_recommendation_fields(query) -> None:
+    select_list = query.text.split("FROM movie_embeddings")[0]
+    columns = [plain or alias for plain, alias in re.findall(r"m\.(\w+)|AS (\w+)", select_list)]
+    expected = [f.name for f in fields(Recommendation) if f.init]
+    # score is filled by reranking, not selected.
+    assert columns == expected[: expected.index("similarity") + 1]
+
+
+def test_next_window_reuses_cached_rerank_inputs(fake_db, monkeypatch: pytest.MonkeyPatch) -> None:
+    def no_inputs(*_args: object) -> None:
+        raise AssertionError("cached rerank inputs should be reused")
+
+    window = recs.MAX_FETCH_CANDIDATES
+    fetched: list[tuple[int, bool]] = []
+
+    def fake_window(_conn, *, apply_dislike: bool, window_index: int, **_kw) -> list:
+        fetched.append((window_index, apply_dislike))
+        return [_rec(window_index * window + i) for i in range(3)]
+
+    cache = InMemoryTTLCache()
+    monkeypatch.setattr(recs, "_CACHE", cache)
+    fake_db(recs)
+    monkeypatch.setattr(recs, "_load_rerank_inputs", no_inputs)
+    monkeypatch.setattr(recs, "_fetch_recommendation_window", fake_window)
+
+    inputs = recs._RerankInputs(
+        user_ctx=None,
+        dislike_ctx=None,
+        dislike_embedding=None,
+        apply_dislike=True,
+        dislike_count=4,
+    )
+    cache.set(
+        recs._recommendation_cache_key(5),
+        FeedCacheEntry(
+            feed_id="f",
+            expires_at=time.time() + 60,
+            items=[_rec(i) for i in range(window)],
+            inputs=inputs,
+        ),
+    )
+
+    page, _meta = recs.get_recommendations_page(5, page_size=2, cursor=window)
+
+    assert [item.id for item in page] == [window, window + 1]
+    assert fetched == [(1, True)]
+    assert cache.get(recs._recommendation_cache_key(5)).inputs is inputs
+
+
+def test_user_without_profile_skips_rerank_inputs_and_caches_empty_feed(
+    fake_db, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def no_candidates(*_args: object, **_kw: object) -> None:
+        raise AssertionError("a user without a profile has no candidates to load")
+
+    cache = InMemoryTTLCache()
+    monkeypatch.setattr(recs, "_CACHE", cache)
+    monkeypatch.setattr(recs, "RECOMMENDATIONS_CACHE_TTL_S", 60)
+    conn = fake_db(recs, results={recs._Q_USER_PROFILE_STATE: (True, False)})
+    monkeypatch.setattr(recs, "_load_rerank_inputs", no_candidates)
+    monkeypatch.setattr(recs, "_fetch_recommendation_window", no_candidates)
+
+    for _ in range(2):
+        page, meta = recs.get_recommendations_page(5, page_size=3, cursor=0)
+        assert page == []
+        assert meta == {"next_cursor": None, "has_more": False}
+
+    assert conn.executed == [recs._Q_USER_PROFILE_STATE]
+
+
+def test_unknown_user_recommendations_are_not_found(
+    fake_db, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(recs, "_CACHE", InMemoryTTLCache())
+    fake_db(recs, results={recs._Q_USER_PROFILE_STATE: (False, False)})
+
+    with pytest.raises(UserNotFoundError):
+        recs.get_recommendations_page(987654, page_size=3, cursor=0)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.main import app
+
+
+@pytest.mark.asyncio
+async def test_request_ids_are_generated_or_echoed() -> None:
+    transport = ASGITransport(app=app, client=("203.0.113.60", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/v1/auth/me")
+        second = await client.get("/v1/auth/me")
+        echoed = await client.get("/v1/auth/me", headers={"X-Request-ID": "abc-123"})
+
+    assert first.headers["x-request-id"] != second.headers["x-request-id"]
+    assert echoed.headers["x-request-id"] == "abc-123"
@@ -1,7 +1,16 @@
 from datetime import date
+from types import SimpleNamespace
 
-from api.rerank.features import extract_year, parse_genres
-from api.rerank.scorer import ScoringContext, score_candidate
+import pytest
+
+from api.rerank.features import extract_year, parse_genres, parse_keyword_sets
+from api.rerank.scorer import (
+    ScoringContext,
+    build_context,
+    inverse_log_max_vote,
+    rerank_candidates,
+    score_candidates,
+)
 
 
 def test_parse_genres():
@@ -11,6 +20,19 @@ def test_parse_genres():
     assert parse_genres("Drama") == {"drama"}
 
 
+def test_parse_keyword_sets_splits_style_subset():
+    keywords, style = parse_keyword_sets("Heist, based on novel, Neo-Noir")
+    assert keywords == {"heist", "based on novel", "neo-noir"}
+    assert style == {"heist", "neo-noir"}
+    assert parse_keyword_sets(None) == (set(), set())
+
+
+def test_parsed_tokens_are_interned():
+    (first,) = parse_genres(" Science Fiction")
+    (second,) = parse_genres("science fiction ")
+    assert first is second
+
+
 def test_extract_year():
     assert extract_year(date(2023, 1, 1)) == 2023
     assert extract_year("2023-01-01") == 2023
@@ -19,49 +41,97 @@ def test_extract_year():
     assert extract_year("invalid") is None
 
 
-def test_score_candidate_same_language():
-    anchor = ScoringContext(
-        genres={"action"}, keywords=set(), style=set(), runtime=100, year=2000, language="en"
-    )
-    candidate = ScoringContext(
-        genres={"action"}, keywords=set(), style=set(), runtime=100, year=2000, language="en"
-    )
-    # Same language should give a bonus
-    score_same = score_candidate(
-        anchor, candidate, distance=0.1, vote_count=100, max_vote_count=1000
+def _ctx(*, runtime: int = 100, language: str = "en") -> ScoringContext:
+    return ScoringContext(
+        genres={"action"},
+        keywords=set(),
+        style=set(),
+        runtime=runtime,
+        year=2000,
+        language=language,
     )
 
-    candidate_diff = ScoringContext(
-        genres={"action"}, keywords=set(), style=set(), runtime=100, year=2000, language="fr"
-    )
-    score_diff = score_candidate(
-        anchor, candidate_diff, distance=0.1, vote_count=100, max_vote_count=1000
-    )
 
+def _scores(anchor: ScoringContext, candidates: list[ScoringContext]) -> list[float]:
+    return score_candidates(
+        anchor,
+        candidates,
+        [0.1] * len(candidates),
+        [100] * len(candidates),
+        inverse_log_max_vote(1000),
+    ).tolist()
+
+
+def test_score_candidates_same_language():
+    score_same, score_diff = _scores(_ctx(), [_ctx(), _ctx(language="fr")])
     assert score_same > score_diff
 
 
-def test_score_candidate_runtime_mismatch():
-    anchor = ScoringContext(
-        genres={"action"}, keywords=set(), style=set(), runtime=100, year=2000, language="en"
-    )
-    candidate_match = ScoringContext(
-        genres={"action"}, keywords=set(), style=set(), runtime=100, year=2000, language="en"
-    )
-    candidate_mismatch = ScoringContext(
-        genres={"action"},
-        keywords=set(),
-        style=set(),
-        runtime=200,  # Large difference
-        year=2000,
-        language="en",
-    )
+def test_score_candidates_runtime_mismatch():
+    score_match, score_mismatch = _scores(_ctx(), [_ctx(), _ctx(runtime=200)])
+    assert score_match > score_mismatch
 
-    score_match = score_candidate(
-        anchor, candidate_match, distance=0.1, vote_count=100, max_vote_count=1000
-    )
-    score_mismatch = score_candidate(
-        anchor, candidate_mismatch, distance=0.1, vote_count=100, max_vote_count=1000
+
+def test_build_context_is_memoized():
+    first = build_context("Drama, Mystery", "neo-noir, heist", 120, date(1999, 5, 1), "EN")
+    second = build_context("Drama, Mystery", "neo-noir, heist", 120, date(1999, 5, 1), "EN")
+
+    assert first is second
+    assert first.style == {"neo-noir", "heist"}
+    assert first.year == 1999
+    assert first.language == "en"
+
+
+def test_score_candidates_weighs_each_feature():
+    anchor = build_context("Comedy, Drama", "satire, heist", 100, "2001-01-01", "en")
+    candidates = [
+        build_context("Comedy, Horror", "heist", 160, "1976-06-01", "en"),
+        build_context("Romance, Family", None, None, None, None),
+    ]
+    inv_log_max = inverse_log_max_vote(500)
+
+    scores = score_candidates(anchor, candidates, [0.1, 1.4], [500, None], inv_log_max)
+
+    first = (
+        0.70 * 0.9
+        + 0.15 * (1 / 3)  # comedy of {comedy, drama, horror}
+        + 0.10 * (1 / 2)  # heist of {satire, heist}
+        + 0.05 * 1.0  # the most-voted candidate
+        + 0.03 * 1.0
+        - 0.06 * 0.5  # horror
+        - 0.05 * 0.5  # 60 minutes longer
+        - 0.05 * 0.5  # 25 years older
     )
+    second = -0.06 * 1.0  # negative similarity clamps to 0; romance and family
+    assert scores.tolist() == pytest.approx([first, second])
 
-    assert score_match > score_mismatch
+
+def test_rerank_candidates_returns_top_n_best_first():
+    def movie(distance: float) -> SimpleNamespace:
+        return SimpleNamespace(
+            genres="Drama",
+            keywords=None,
+            runtime=100,
+            release_date="2000",
+            original_language="en",
+            vote_count=10,
+            distance=distance,
+            score=None,
+        )
+
+    anchor_ctx = build_context("Drama", None, 100, "2000", "en")
+    candidates = [movie(d) for d in (0.5, 0.1, 0.9, 0.3)]
+
+    top = rerank_candidates(candidates=candidates, top_n=2, anchor_context=anchor_ctx)
+
+    assert [c.distance for c in top] == [0.1, 0.3]
+
+
+def test_genre_bits_track_genre_sets():
+    left = build_context("Comedy, Drama, Horror", None, None, None, None)
+    right = build_context("drama, horror, Thriller", None, None, None, None)
+
+    overlap = (left.genre_bits & right.genre_bits).bit_count()
+    union = (left.genre_bits | right.genre_bits).bit_count()
+
+    assert (overlap, union) == (len(left.genres & right.genres), len(left.genres | right.genres))
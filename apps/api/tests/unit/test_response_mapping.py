@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import api.v1.main as v1_main
+from api.main import app
+from api.users.types import RatingQueueItem
+
+
+@pytest.mark.asyncio
+async def test_guest_feed_serializes_trusted_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    def get_rating_queue(_user_id: int, _limit: int, _offset: int) -> list[RatingQueueItem]:
+        return [
+            RatingQueueItem(
+                id=7,
+                title="Heat",
+                release_date=date(1995, 12, 15),
+                genres="Crime",
+                poster_path="/heat.jpg",
+                backdrop_path=None,
+            )
+        ]
+
+    monkeypatch.setattr(v1_main, "get_rating_queue", get_rating_queue)
+
+    transport = ASGITransport(app=app, client=("203.0.113.30", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/v1/feed?k=5")
+
+    assert resp.status_code == 200
+    assert resp.json()["data"] == [
+        {
+            "id": 7,
+            "title": "Heat",
+            "release_date": "1995-12-15",
+            "genres": "Crime",
+            "distance": None,
+            "similarity": None,
+            "score": None,
+            "source": "popularity",
+            "poster_url": "https://image.tmdb.org/t/p/w500/heat.jpg",
+            "backdrop_url": None,
+        }
+    ]
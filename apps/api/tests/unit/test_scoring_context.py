@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+import api.users.scoring as scoring
+from api.users.embeddings import _profile_weight
+from api.users.scoring import _build_weighted_scoring_context
+
+
+def test_weighted_scoring_context_aggregates_rated_movies() -> None:
+    rows = [
+        {
+            "genres": "Drama, Crime",
+            "keywords": "heist, neo-noir",
+            "runtime": 120,
+            "release_date": date(2000, 1, 1),
+            "original_language": "EN",
+            "rating": 5,
+        },
+        {
+            "genres": "Drama",
+            "keywords": "heist",
+            "runtime": None,
+            "release_date": None,
+            "original_language": "fr",
+            "rating": 4,
+        },
+        {
+            "genres": "Horror",
+            "keywords": None,
+            "runtime": 90,
+            "release_date": "1980-01-01",
+            "original_language": "de",
+            "rating": 1,  # zero weight
+        },
+    ]
+
+    ctx, count = _build_weighted_scoring_context(iter(rows), _profile_weight)
+
+    assert count == 3
+    assert ctx is not None
+    assert ctx.genres == {"drama", "crime"}
+    assert ctx.keywords == {"heist", "neo-noir"}
+    assert ctx.style == {"heist", "neo-noir"}
+    assert (ctx.runtime, ctx.year, ctx.language) == (120, 2000, "en")
+
+
+def test_weighted_scoring_context_sums_weights_across_ratings() -> None:
+    def row(language: str, rating: int) -> dict:
+        return {
+            "genres": None,
+            "keywords": None,
+            "runtime": None,
+            "release_date": None,
+            "original_language": language,
+            "rating": rating,
+        }
+
+    # Two 4-star French films (0.8 each) outweigh one 5-star English film.
+    ctx, _count = _build_weighted_scoring_context(
+        [row("en", 5), row("fr", 4), row("fr", 4)], _profile_weight
+    )
+
+    assert ctx is not None
+    assert ctx.language == "fr"
+
+
+def test_weighted_scoring_context_breaks_ties_by_recency(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(scoring, "MAX_SCORING_GENRES", 1)
+
+    def row(genres: str | None, rating: int) -> dict:
+        return {
+            "genres": genres,
+            "keywords": None,
+            "runtime": None,
+            "release_date": None,
+            "original_language": None,
+            "rating": rating,
+        }
+
+    # Most recent first. Comedy (0.5 + 0.5) ties Horror (1.0) and was rated more recently,
+    # though Horror's weight was seen first.
+    rows = [row(None, 5), row("Comedy", 4), row("Horror", 5), row("Comedy", 3)]
+    ctx, _count = _build_weighted_scoring_context(rows, {5: 1.0, 4: 0.5, 3: 0.5}.get)
+
+    assert ctx is not None
+    assert ctx.genres == {"comedy"}
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+
+import api.users.db as users_db
+import api.users.match as match
+import api.users.queue as queue
+from api.ttl_cache import TTLCache
+from api.users.types import MovieNotFoundError, UserNotFoundError
+
+
+@pytest.fixture(autouse=True)
+def _empty_existence_caches(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(users_db, "_KNOWN_USERS", TTLCache(max_size=10, ttl_s=60))
+
+
+def test_next_movie_checks_out_one_connection(fake_db) -> None:
+    conn = fake_db(
+        queue,
+        users_db,
+        results={
+            users_db._Q_USER_EXISTS: True,
+            queue._Q_NEXT_MOVIE: (7, "Popular", None, None, None, None, "popularity"),
+        },
+    )
+
+    next_movie = queue.get_next_movie(3)
+
+    assert next_movie is not None
+    assert (next_movie.id, next_movie.source) == (7, "popularity")
+    assert conn.checkouts == 1
+
+
+@pytest.mark.parametrize(
+    ("row", "expected"),
+    [
+        ((True, True, 0.25), 75.0),
+        ((True, True, None), None),
+        ((False, True, None), UserNotFoundError),
+        ((True, False, None), MovieNotFoundError),
+    ],
+)
+def test_movie_match_is_one_statement(fake_db, row: tuple, expected: object) -> None:
+    fake_db(match, results={match._Q_MATCH_DISTANCE: row})
+
+    if isinstance(expected, type):
+        with pytest.raises(expected):
+            match.get_user_movie_match(3, 7)
+    else:
+        assert match.get_user_movie_match(3, 7).score == expected
+
+
+@pytest.mark.parametrize("user_exists", [True, False])
+def test_next_movie_without_a_pick_probes_the_user(fake_db, user_exists: bool) -> None:
+    fake_db(queue, results={users_db._Q_USER_EXISTS: user_exists})
+
+    if user_exists:
+        assert queue.get_next_movie(3) is None
+    else:
+        with pytest.raises(UserNotFoundError):
+            queue.get_next_movie(3)
+
+
+def test_known_user_skips_the_existence_query(fake_db, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_db(users_db, results={users_db._Q_USER_EXISTS: True})
+    users_db.ensure_user(3)
+
+    monkeypatch.setattr(users_db, "read_connection", lambda: pytest.fail("should be cached"))
+    users_db.ensure_user(3)
+
+
+def test_rating_queue_for_unknown_user_is_not_found(fake_db) -> None:
+    # The popularity queue filters itself out for unknown users instead of serving everyone.
+    assert "FROM users WHERE id = :user_id" in queue._Q_RATING_QUEUE.text
+    fake_db(queue, results={users_db._Q_USER_EXISTS: False})
+
+    with pytest.raises(UserNotFoundError):
+        queue.get_rating_queue(3, limit=10)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import re
+from dataclasses import fields
+
+import pytest
+
+import api.similarity as similarity
+
+
+def _candidate_row(movie_id: int) -> tuple:
+    # Column order of _Q_SIMILAR_CANDIDATES: id, title, ..., backdrop_path, distance.
+    return (movie_id, "Movie", None, None, None, None, None, None, None, None, None, 0.25)
+
+
+def test_similar_candidates_use_a_single_query(fake_db) -> None:
+    conn = fake_db(similarity, results={similarity._Q_SIMILAR_CANDIDATES: [_candidate_row(2)]})
+
+    candidates = similarity.get_similar_candidates(1, k=10)
+
+    assert [(c.id, c.distance) for c in candidates] == [(2, 0.25)]
+    assert conn.executed == [similarity._Q_SIMILAR_CANDIDATES]
+
+
+def test_missing_embedding_is_reported(fake_db) -> None:
+    conn = fake_db(similarity)
+
+    with pytest.raises(similarity.EmbeddingNotFoundError):
+        similarity.get_similar_candidates(1, k=10)
+    assert conn.executed == [similarity._Q_SIMILAR_CANDIDATES, similarity._Q_EMBEDDING_EXISTS]
+
+
+def test_candidate_columns_follow_candidate_fields() -> None:
+    select_list = similarity._Q_SIMILAR_CANDIDATES.text.split("FROM movie_embeddings e")[0]
+    columns = [plain or alias for plain, alias in re.findall(r"m\.(\w+)|AS (\w+)", select_list)]
+    expected = [f.name for f in fields(similarity.Candidate) if f.init]
+    # score is filled by reranking, not selected.
+    assert columns == expected[: expected.index("distance") + 1]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import pytest
+
+import api.ttl_cache as ttl_cache
+from api.ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache: TTLCache[int, str] = TTLCache(max_size=10, ttl_s=60)
+
+    cache.set(1, "a")
+    assert cache.get(1) == "a"
+
+    now[0] += 61
+    assert cache.get(1) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=2, ttl_s=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+
+
+def test_zero_ttl_disables_cache() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=10, ttl_s=0)
+    cache.set(1, "a")
+    assert cache.get(1) is None
+
+
+def test_per_entry_ttl_only_shortens_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache: TTLCache[int, str] = TTLCache(max_size=10, ttl_s=60)
+
+    cache.set(1, "short", ttl_s=5)
+    cache.set(2, "capped", ttl_s=600)
+    cache.set(3, "expired", ttl_s=0)
+
+    now[0] += 6
+    assert cache.get(1) is None
+    assert cache.get(2) == "capped"
+    assert cache.get(3) is None
+
+    now[0] += 60
+    assert cache.get(2) is None
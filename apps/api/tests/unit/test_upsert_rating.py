@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import api.users.ratings as ratings
+from api.users.types import MovieNotFoundError, UserNotFoundError
+
+
+def _fk_violation(constraint: str) -> IntegrityError:
+    orig = SimpleNamespace(diag=SimpleNamespace(constraint_name=constraint))
+    return IntegrityError("INSERT", {}, orig)
+
+
+@pytest.mark.parametrize(
+    ("constraint", "error"),
+    [
+        (ratings._USER_FK, UserNotFoundError),
+        (ratings._MOVIE_FK, MovieNotFoundError),
+        ("some_other_constraint", IntegrityError),
+    ],
+)
+def test_foreign_key_violation_maps_to_not_found(
+    fake_db, constraint: str, error: type[Exception]
+) -> None:
+    fake_db(ratings, error=_fk_violation(constraint))
+
+    with pytest.raises(error):
+        ratings.upsert_rating(1, 2, 4, "watched")
+
+
+def test_bulk_upsert_is_one_statement_with_last_item_winning(
+    fake_db, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = fake_db(ratings)
+    invalidated: list[int] = []
+    monkeypatch.setattr(ratings, "invalidate_recommendations_cache", invalidated.append)
+
+    written = ratings.bulk_upsert_ratings(
+        1, [(10, 4, "watched"), (11, None, "unwatched"), (10, 5, "watched")]
+    )
+
+    assert written == 2
+    assert conn.executed == [ratings._Q_BULK_UPSERT_RATINGS]
+    assert conn.params == [
+        {
+            "user_id": 1,
+            "movie_ids": [10, 11],
+            "ratings": [5, None],
+            "statuses": ["watched", "unwatched"],
+        }
+    ]
+    assert invalidated == [1]
+
+
+def test_bulk_upsert_maps_missing_movie(fake_db) -> None:
+    fake_db(ratings, error=_fk_violation(ratings._MOVIE_FK))
+
+    with pytest.raises(MovieNotFoundError):
+        ratings.bulk_upsert_ratings(1, [(10, 4, "watched")])
+
+
+def test_bulk_upsert_without_items_skips_the_database(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ratings, "get_engine", lambda: pytest.fail("no query expected"))
+
+    assert ratings.bulk_upsert_ratings(1, []) == 0
@@ -93,6 +93,7 @@ CREATE TABLE IF NOT EXISTS user_profiles (
   embedding vector(768) NOT NULL,
   embedding_model TEXT,
   num_ratings INT NOT NULL DEFAULT 0,
+  ratings_digest TEXT,
   updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
@@ -32,6 +32,17 @@ def main() -> None:
                 """
             )
         )
+        # Dropping the table dropped its index too; keep in sync with infra/db/init.sql.
+        conn.execute(
+            text(
+                """
+                CREATE INDEX IF NOT EXISTS idx_movie_embeddings_embedding_hnsw_cosine
+                  ON movie_embeddings
+                  USING hnsw (embedding vector_cosine_ops)
+                  WITH (m = 16, ef_construction = 64)
+                """
+            )
+        )
 
     print(f"movie_embeddings recreated with vector({new_dim}).")
 